@@ -0,0 +1,237 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.filters import IngredientsFilter
+from api.mixins import (
+    cache_origin,
+    catalogue_etag,
+    catalogue_not_modified,
+    list_cache_key,
+    set_catalogue_headers,
+)
+from api.serializers import IngredientsSerializer
+from api.views import IngredientsViewSet, RecipesViewSet, TagsViewSet
+from recipes.catalogue import ingredients_catalogue, tags_catalogue
+from recipes.models import Ingredients
+from recipes.recipe_cache import (
+    get_list_page,
+    get_recipe,
+    list_generation,
+    recipe_versions,
+    set_list_page,
+    set_recipe,
+)
+from recipes.short_links import known_recipes, short_link
+
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}
+
+
+def async_view(viewset, actions, detail, basename):
+    """Асинхронный GET с передачей остальных запросов вьюсету.
+
+    Обработчик возвращает None, если ответ должен построить обычный
+    вьюсет: запись, ошибки аутентификации и валидации, несуществующие
+    объекты, браузерный API. Так формат ошибок остаётся прежним.
+    """
+    sync_view = viewset.as_view(actions, basename=basename, detail=detail)
+
+    def decorator(handler):
+        async def view(request, **kwargs):
+            if request.method == 'GET' and _wants_json(request):
+                response = await handler(request, **kwargs)
+                if response is not None:
+                    return response
+            return await sync_to_async(sync_view)(request, **kwargs)
+
+        view.csrf_exempt = True
+        view.actions = actions
+        return view
+
+    return decorator
+
+
+def _wants_json(request):
+    return (
+        'format' not in request.GET
+        and 'text/html' not in request.headers.get('Accept', '')
+    )
+
+
+def json_response(data):
+    response = HttpResponse(
+        JSONRenderer().render(data), content_type='application/json'
+    )
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+async def authenticate(request):
+    """Пользователь по токену или None, если токен недействителен."""
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    if keyword.lower() != 'token':
+        return AnonymousUser()
+    token = await Token.objects.select_related('user').filter(
+        key=key.strip()
+    ).afirst()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def bind(viewset, request, user, action, **kwargs):
+    """Экземпляр вьюсета для запроса, как его создаёт as_view()."""
+    drf_request = Request(request)
+    drf_request.user = user
+    return viewset(
+        request=drf_request, action=action, args=(), kwargs=kwargs,
+        format_kwarg=None,
+    )
+
+
+@async_view(RecipesViewSet, LIST_ACTIONS, detail=False, basename='recipes')
+async def recipe_list(request):
+    user = await authenticate(request)
+    if user is None:
+        return None
+    view = bind(RecipesViewSet, request, user, 'list')
+
+    key = None
+    if not user.is_authenticated:
+        key = list_cache_key(request, view.cache_query_params)
+        search = view.search_param in request.GET
+        data = await sync_to_async(get_list_page)(key, search)
+        if data is not None:
+            return json_response(data)
+        generation = await sync_to_async(list_generation)(search)
+
+    try:
+        queryset = await sync_to_async(view.filter_queryset)(
+            view.get_queryset()
+        )
+    except ValidationError:
+        return None
+    paginator = view.paginator
+    recipes = await paginator.apaginate_queryset(
+        queryset.prefetch_related(None), view.request
+    )
+    if recipes is None:
+        return None
+    versions = await sync_to_async(recipe_versions)(
+        [recipe.id for recipe in recipes]
+    )
+    results = await sync_to_async(view.serialize_page)(recipes, versions)
+    data = paginator.get_paginated_response(results).data
+    if key is not None:
+        await sync_to_async(set_list_page)(key, generation, versions, data)
+    return json_response(data)
+
+
+@async_view(RecipesViewSet, DETAIL_ACTIONS, detail=True, basename='recipes')
+async def recipe_detail(request, pk):
+    user = await authenticate(request)
+    if user is None:
+        return None
+    origin = cache_origin(request)
+    if not user.is_authenticated:
+        data = await sync_to_async(get_recipe)(pk, origin)
+        if data is not None:
+            return json_response(data)
+        version = (await sync_to_async(recipe_versions)([pk]))[pk]
+
+    view = bind(RecipesViewSet, request, user, 'retrieve', pk=pk)
+    recipe = await view.get_queryset().filter(pk=pk).afirst()
+    if recipe is None:
+        return None
+    data = await sync_to_async(lambda: view.get_serializer(recipe).data)()
+    if not user.is_authenticated:
+        await sync_to_async(set_recipe)(pk, origin, version, data)
+    return json_response(data)
+
+
+@async_view(RecipesViewSet, {'get': 'get_link'}, detail=True,
+            basename='recipes')
+async def recipe_get_link(request, pk):
+    if await authenticate(request) is None:
+        return None
+    if not await sync_to_async(known_recipes.exists)(pk):
+        return None
+    return json_response({'short-link': short_link(pk)})
+
+
+async def catalogue_response(request, catalogue, build_data):
+    """Ответ справочника с ETag, как в CatalogueCacheMixin."""
+    if await authenticate(request) is None:
+        return None
+    entry = await sync_to_async(catalogue.get)()
+    if entry is None:
+        return None
+    etag = catalogue_etag(entry, request)
+    response = catalogue_not_modified(entry, etag, request)
+    if response is None:
+        data = await build_data(entry)
+        if data is None:
+            return None
+        response = json_response(data)
+    return set_catalogue_headers(response, entry, etag)
+
+
+@async_view(IngredientsViewSet, {'get': 'list'}, detail=False,
+            basename='ingredients')
+async def ingredient_list(request):
+    async def build_data(entry):
+        if not request.GET:
+            return entry.data
+        filterset = IngredientsFilter(
+            request.GET, queryset=Ingredients.objects.all()
+        )
+        if not filterset.is_valid():
+            return None
+        return IngredientsSerializer(
+            [ingredient async for ingredient in filterset.qs], many=True
+        ).data
+
+    return await catalogue_response(
+        request, ingredients_catalogue, build_data
+    )
+
+
+@async_view(IngredientsViewSet, {'get': 'retrieve'}, detail=True,
+            basename='ingredients')
+async def ingredient_detail(request, pk):
+    async def build_data(entry):
+        return entry.by_id.get(pk)
+
+    return await catalogue_response(
+        request, ingredients_catalogue, build_data
+    )
+
+
+@async_view(TagsViewSet, LIST_ACTIONS, detail=False, basename='tags')
+async def tag_list(request):
+    if request.GET:
+        return None
+
+    async def build_data(entry):
+        return entry.data
+
+    return await catalogue_response(request, tags_catalogue, build_data)
+
+
+@async_view(TagsViewSet, DETAIL_ACTIONS, detail=True, basename='tags')
+async def tag_detail(request, pk):
+    async def build_data(entry):
+        return entry.by_id.get(pk)
+
+    return await catalogue_response(request, tags_catalogue, build_data)
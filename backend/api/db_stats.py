@@ -0,0 +1,99 @@
+import os
+import threading
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from prometheus_client.core import GaugeMetricFamily
+
+from foodgram.metrics import DB_CONNECTIONS_OPENED
+
+_lock = threading.Lock()
+_counters = {'connections_opened': 0, 'requests': 0}
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    with _lock:
+        _counters['connections_opened'] += 1
+    DB_CONNECTIONS_OPENED.inc()
+
+
+@receiver(request_finished)
+def count_request(sender, **kwargs):
+    with _lock:
+        _counters['requests'] += 1
+
+
+def process_stats():
+    """Открытые соединения и обработанные запросы текущего воркера.
+
+    При постоянных соединениях connections_per_request стремится к нулю,
+    при CONN_MAX_AGE=0 равен единице.
+    """
+    with _lock:
+        stats = dict(_counters)
+    stats['pid'] = os.getpid()
+    stats['connections_per_request'] = (
+        round(stats['connections_opened'] / stats['requests'], 3)
+        if stats['requests'] else None
+    )
+    return stats
+
+
+def server_stats(alias='default'):
+    """Соединения с базой на стороне PostgreSQL и загрузка пула.
+
+    Лимит - размер пула PgBouncer, если он используется, иначе
+    max_connections сервера.
+    """
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            "SELECT coalesce(state, 'unknown'), count(*) "
+            'FROM pg_stat_activity WHERE datname = current_database() '
+            'GROUP BY 1'
+        )
+        states = dict(cursor.fetchall())
+        cursor.execute('SHOW max_connections')
+        max_connections = int(cursor.fetchone()[0])
+    total = sum(states.values())
+    in_use = total - states.get('idle', 0)
+    limit = settings.DB_POOL_SIZE if settings.DB_POOLER else max_connections
+    return {
+        'states': states,
+        'total': total,
+        'in_use': in_use,
+        'limit': limit,
+        'utilisation': round(in_use / limit, 3),
+    }
+
+
+def connection_settings(alias='default'):
+    database = settings.DATABASES[alias]
+    return {
+        'conn_max_age': database['CONN_MAX_AGE'],
+        'conn_health_checks': database['CONN_HEALTH_CHECKS'],
+        'pooler': settings.DB_POOLER or None,
+    }
+
+
+class DatabaseCollector:
+    """Соединения с базой и загрузка пула на момент сбора метрик."""
+
+    def collect(self):
+        stats = server_stats()
+        states = GaugeMetricFamily(
+            'foodgram_db_connections',
+            'Соединения с базой по состоянию.',
+            labels=('state',),
+        )
+        for state, count in stats['states'].items():
+            states.add_metric((state,), count)
+        yield states
+        yield GaugeMetricFamily(
+            'foodgram_db_pool_utilisation',
+            'Доля занятых соединений от размера пула или max_connections.',
+            value=stats['utilisation'],
+        )
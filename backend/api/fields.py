@@ -0,0 +1,128 @@
+import binascii
+import re
+import uuid
+from base64 import b64decode
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile,
+    TemporaryUploadedFile,
+)
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers
+
+from recipes.constants import (
+    BASE64_CHUNK_SIZE,
+    IMAGE_UPLOAD_MAX_PIXELS,
+    IMAGE_UPLOAD_MAX_SIZE,
+)
+
+BASE64_WHITESPACE = ' \t\r\n'
+BASE64_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения по ширине."""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for width, name in value.items():
+            url = default_storage.url(name)
+            urls[width] = request.build_absolute_uri(url) if request else url
+        return urls
+
+
+class StreamingBase64ImageField(Base64ImageField):
+    """Изображение в base64 с декодированием по частям.
+
+    Размер файла проверяется по длине строки до декодирования, затем
+    строка декодируется кусками в файл загрузки: небольшие файлы
+    остаются в памяти, крупные уходят во временный файл на диске, как
+    при обычной multipart-загрузке Django. Пробелы и переводы строк
+    пропускаются, как в Base64ImageField: многие клиенты переносят
+    base64 по 76 символов. Формат и размеры в пикселях читаются из
+    заголовка до полной проверки изображения.
+    """
+
+    def to_internal_value(self, data):
+        if data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(data, str):
+            raise serializers.ValidationError(
+                'Изображение должно быть строкой base64.'
+            )
+
+        start = data.find(';base64,')
+        start = 0 if start == -1 else start + len(';base64,')
+        end = len(data)
+        while end > start and data[end - 1].isspace():
+            end -= 1
+        spaces = sum(
+            data.count(char, start, end) for char in BASE64_WHITESPACE
+        )
+        size = (end - start - spaces) * 3 // 4 - data.count('=', end - 2, end)
+        if size > IMAGE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'Размер изображения больше '
+                f'{IMAGE_UPLOAD_MAX_SIZE // (1024 * 1024)} МБ.'
+            )
+
+        upload = self.decode(data, start, size)
+        upload.name = f'{uuid.uuid4()}.{self.check_header(upload)}'
+        return serializers.ImageField.to_internal_value(self, upload)
+
+    def decode(self, data, start, size):
+        """Декодирование base64 по частям в файл загрузки.
+
+        Из куска удаляются пробельные символы, а хвост, не кратный
+        четырём символам, переносится в следующий кусок.
+        """
+        if size <= settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            upload = InMemoryUploadedFile(
+                BytesIO(), None, 'upload', None, size, None
+            )
+        else:
+            upload = TemporaryUploadedFile('upload', None, size, None)
+        rest = ''
+        try:
+            for offset in range(start, len(data), BASE64_CHUNK_SIZE):
+                chunk = rest + BASE64_WHITESPACE_RE.sub(
+                    '', data[offset:offset + BASE64_CHUNK_SIZE]
+                )
+                aligned = len(chunk) - len(chunk) % 4
+                upload.write(b64decode(chunk[:aligned], validate=True))
+                rest = chunk[aligned:]
+            if rest:
+                raise ValueError('Длина base64 не кратна четырём.')
+        except (binascii.Error, ValueError):
+            upload.close()
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        upload.size = upload.tell()
+        upload.seek(0)
+        return upload
+
+    def check_header(self, upload):
+        """Расширение по заголовку с проверкой формата и размеров."""
+        try:
+            with Image.open(upload) as image:
+                extension = (image.format or '').lower()
+                width, height = image.size
+        except (UnidentifiedImageError, OSError):
+            upload.close()
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        upload.seek(0)
+
+        extension = 'jpg' if extension == 'jpeg' else extension
+        if extension not in self.ALLOWED_TYPES:
+            upload.close()
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        if width * height > IMAGE_UPLOAD_MAX_PIXELS:
+            upload.close()
+            raise serializers.ValidationError(
+                f'Изображение больше {IMAGE_UPLOAD_MAX_PIXELS} пикселей.'
+            )
+        return extension
@@ -1,12 +1,33 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Case, Exists, F, OuterRef, Value, When
 from django_filters import ModelMultipleChoiceFilter
 from django_filters import rest_framework as filters
 
-from recipes.models import Ingredients, Recipes, Tags
+from recipes.constants import (
+    INGREDIENTS_SEARCH_LIMIT,
+    INGREDIENTS_TRIGRAM_MIN_LENGTH,
+    SEARCH_CONFIG,
+)
+from recipes.models import (
+    Favorite,
+    Ingredients,
+    Recipes,
+    ShoppingCart,
+    Tags,
+)
 from users.models import User
 
 
 class RecipeFilter(filters.FilterSet):
-    """Класс с фильтрами для рецептов"""
+    """Класс с фильтрами для рецептов
+
+    Теги, избранное и корзина проверяются через EXISTS, а не через JOIN:
+    рецепт попадает в выборку один раз при любом количестве совпавших
+    тегов, и count пагинатора не завышается.
+
+    Параметр search ищет по названию, тексту и ингредиентам через
+    полнотекстовый индекс и упорядочивает выдачу по релевантности.
+    """
 
     is_favorited = filters.BooleanFilter(method='favorited_method')
     is_in_shopping_cart = filters.BooleanFilter(
@@ -16,26 +37,58 @@ class RecipeFilter(filters.FilterSet):
         field_name='tags__slug',
         to_field_name='slug',
         queryset=Tags.objects.all(),
+        method='tags_method',
     )
+    search = filters.CharFilter(method='search_method')
 
     class Meta:
         model = Recipes
         fields = ('author', 'tags')
 
+    def tags_method(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(Exists(Recipes.tags.through.objects.filter(
+            recipes=OuterRef('pk'), tags__in=value)))
+
+    def search_method(self, queryset, name, value):
+        query = SearchQuery(
+            value, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-pub_date', '-id')
+
     def favorited_method(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(favorite__user=self.request.user)
+            return queryset.filter(Exists(Favorite.objects.filter(
+                user=self.request.user, recipes=OuterRef('pk'))))
         return queryset
 
     def in_shopping_cart_method(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(shopping_list__author=self.request.user)
+            return queryset.filter(Exists(ShoppingCart.objects.filter(
+                author=self.request.user, recipes=OuterRef('pk'))))
         return queryset
 
 
 class IngredientsFilter(filters.FilterSet):
-    name = filters.CharFilter(field_name='name', lookup_expr='istartswith')
+    """Поиск ингредиентов: сначала по началу названия, затем по вхождению."""
+
+    name = filters.CharFilter(method='search_name')
 
     class Meta:
         model = Ingredients
         fields = ['name']
+
+    def search_name(self, queryset, name, value):
+        if len(value) < INGREDIENTS_TRIGRAM_MIN_LENGTH:
+            return queryset.filter(
+                name__istartswith=value
+            ).order_by('name')[:INGREDIENTS_SEARCH_LIMIT]
+        return queryset.filter(name__icontains=value).annotate(
+            prefix_match=Case(
+                When(name__istartswith=value, then=Value(True)),
+                default=Value(False),
+            )
+        ).order_by('-prefix_match', 'name')[:INGREDIENTS_SEARCH_LIMIT]
@@ -0,0 +1,233 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredients, Recipes, Tags
+from recipes.short_links import encode
+from users.models import User
+
+LATENCY_METRICS = ('p50_ms', 'p95_ms')
+MEMORY_METRIC = 'peak_memory_kb'
+QUERIES_METRIC = 'queries'
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(0, round(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    """Замер количества запросов, задержки и памяти для эндпоинтов API."""
+
+    help = ('Прогоняет эндпоинты API на текущих данных и сохраняет '
+            'количество SQL-запросов, p50/p95 задержки и пик памяти '
+            'в JSON-отчёт. С --compare сравнивает с предыдущим отчётом.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Количество замеров на каждый эндпоинт.'
+        )
+        parser.add_argument(
+            '--output', default='benchmark_report.json',
+            help='Путь для сохранения отчёта.'
+        )
+        parser.add_argument(
+            '--compare', metavar='BASELINE',
+            help='Отчёт, с которым сравнить текущий прогон.'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый рост задержки и памяти (доля от базовой).'
+        )
+        parser.add_argument(
+            '--only', nargs='*', default=(),
+            help='Запустить только перечисленные сценарии.'
+        )
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            baseline = self._load_report(options['compare'])
+
+        scenarios = self.get_scenarios()
+        if options['only']:
+            scenarios = [
+                scenario for scenario in scenarios
+                if scenario[0] in options['only']
+            ]
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for name, method, path, user in scenarios:
+                results[name] = self.measure(
+                    method, path, user, options['repeat']
+                )
+                self.stdout.write(self._format_row(name, results[name]))
+
+        report = {
+            'meta': self._meta(),
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Отчёт сохранён в {options["output"]}')
+
+        if options['compare']:
+            regressions = self.compare(
+                baseline['results'], results, options['tolerance']
+            )
+            if regressions:
+                raise CommandError(
+                    'Обнаружена регрессия:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий не обнаружено.'))
+
+    def get_scenarios(self):
+        """Список сценариев: имя, метод, путь и пользователь."""
+        user = User.objects.annotate(
+            cart_size=Count('shopping_list')
+        ).order_by('-cart_size').first()
+        recipe = Recipes.objects.order_by('-pub_date').first()
+        if user is None or recipe is None:
+            raise CommandError(
+                'Нет данных для замера, выполните seed_benchmark_data.'
+            )
+        tags = '&'.join(
+            f'tags={slug}'
+            for slug in Tags.objects.values_list('slug', flat=True)[:2]
+        )
+        ingredient = Ingredients.objects.order_by('name').first()
+        prefix = ingredient.name[:2] if ingredient else 'а'
+
+        return [
+            ('recipes_list_anonymous', 'get', '/api/recipes/', None),
+            ('recipes_list', 'get', '/api/recipes/', user),
+            ('recipes_list_max_page', 'get', '/api/recipes/?limit=100', user),
+            ('recipes_filter_tags', 'get', f'/api/recipes/?{tags}', user),
+            ('recipes_filter_author', 'get',
+             f'/api/recipes/?author={recipe.author_id}', user),
+            ('recipes_filter_favorited', 'get',
+             '/api/recipes/?is_favorited=1', user),
+            ('recipes_filter_shopping_cart', 'get',
+             '/api/recipes/?is_in_shopping_cart=1', user),
+            ('recipes_detail', 'get', f'/api/recipes/{recipe.id}/', user),
+            ('recipes_get_link', 'get',
+             f'/api/recipes/{recipe.id}/get-link/', user),
+            ('short_link_redirect', 'get', f'/s/{encode(recipe.id)}', None),
+            ('download_shopping_cart', 'get',
+             '/api/recipes/download_shopping_cart/', user),
+            ('subscriptions', 'get',
+             '/api/users/subscriptions/?recipes_limit=3', user),
+            ('users_list', 'get', '/api/users/', user),
+            ('users_me', 'get', '/api/users/me/', user),
+            ('tags_list', 'get', '/api/tags/', None),
+            ('ingredients_list', 'get', '/api/ingredients/', None),
+            ('ingredients_search', 'get',
+             f'/api/ingredients/?name={prefix}', None),
+        ]
+
+    def measure(self, method, path, user, repeat):
+        """Замер одного эндпоинта."""
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        request = getattr(client, method)
+
+        response = request(path)
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{method.upper()} {path} вернул {response.status_code}'
+            )
+
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = request(path)
+                self._consume(response)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, len(context.captured_queries))
+
+        tracemalloc.start()
+        self._consume(request(path))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            'method': method.upper(),
+            'path': path,
+            'status': response.status_code,
+            QUERIES_METRIC: queries,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            MEMORY_METRIC: round(peak / 1024, 1),
+        }
+
+    @staticmethod
+    def _consume(response):
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+
+    def compare(self, baseline, current, tolerance):
+        """Список регрессий текущего прогона относительно базового."""
+        regressions = []
+        for name, result in current.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            if result[QUERIES_METRIC] > previous[QUERIES_METRIC]:
+                regressions.append(
+                    f'{name}: запросов {previous[QUERIES_METRIC]} -> '
+                    f'{result[QUERIES_METRIC]}'
+                )
+            for metric in (*LATENCY_METRICS, MEMORY_METRIC):
+                limit = previous[metric] * (1 + tolerance)
+                if result[metric] > limit:
+                    regressions.append(
+                        f'{name}: {metric} {previous[metric]} -> '
+                        f'{result[metric]}'
+                    )
+        return regressions
+
+    @staticmethod
+    def _load_report(path):
+        try:
+            with open(path, encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+
+    @staticmethod
+    def _meta():
+        return {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'users': User.objects.count(),
+            'recipes': Recipes.objects.count(),
+            'ingredients': Ingredients.objects.count(),
+        }
+
+    @staticmethod
+    def _format_row(name, result):
+        return (
+            f'{name:<32} {result["status"]:>3} '
+            f'queries={result[QUERIES_METRIC]:<4} '
+            f'p50={result["p50_ms"]:>8.2f}ms p95={result["p95_ms"]:>8.2f}ms '
+            f'peak={result[MEMORY_METRIC]:>9.1f}KB'
+        )
@@ -0,0 +1,191 @@
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.benchmark_api import percentile
+from recipes.models import Ingredients, Recipes, Tags
+from recipes.short_links import encode
+
+SERVER_MODES = ('wsgi', 'asgi')
+STARTUP_TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    """Сравнение пропускной способности WSGI и ASGI."""
+
+    help = ('Поочерёдно запускает gunicorn с синхронными воркерами и с '
+            'воркерами uvicorn при одинаковом числе воркеров, нагружает '
+            'эндпоинты чтения параллельными запросами и сравнивает '
+            'запросы в секунду и задержки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument(
+            '--concurrency', type=int, default=32,
+            help='Количество одновременных клиентов.'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Длительность нагрузки на каждый эндпоинт, секунд.'
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен пользователя для авторизованных запросов.'
+        )
+        parser.add_argument(
+            '--modes', nargs='+', choices=SERVER_MODES,
+            default=SERVER_MODES,
+        )
+        parser.add_argument('--output', default='benchmark_servers.json')
+
+    def handle(self, *args, **options):
+        paths = self.get_paths()
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+
+        report = {
+            'meta': {
+                'workers': options['workers'],
+                'concurrency': options['concurrency'],
+                'duration': options['duration'],
+                'authenticated': bool(options['token']),
+            },
+            'results': {},
+        }
+        for mode in options['modes']:
+            port = free_port()
+            server = self.start_server(mode, port, options['workers'])
+            try:
+                results = report['results'][mode] = {}
+                for name, path in paths:
+                    results[name] = self.load(
+                        port, path, headers,
+                        options['concurrency'], options['duration'],
+                    )
+                    self.stdout.write(self._format_row(
+                        mode, name, results[name]
+                    ))
+            finally:
+                server.terminate()
+                server.wait()
+
+        if set(SERVER_MODES) <= set(report['results']):
+            self.stdout.write(self.compare(report['results']))
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчёт сохранён в {options["output"]}'
+        ))
+
+    @staticmethod
+    def get_paths():
+        recipe = Recipes.objects.order_by('-pub_date', '-id').first()
+        tags = Tags.objects.order_by('id').values_list('slug', flat=True)[:2]
+        ingredient = Ingredients.objects.order_by('id').first()
+        if recipe is None or ingredient is None:
+            raise CommandError('В базе нет рецептов или ингредиентов.')
+        query = '&'.join(f'tags={slug}' for slug in tags)
+        return (
+            ('recipes_list', '/api/recipes/'),
+            ('recipes_list_tags', f'/api/recipes/?{query}'),
+            ('recipe_detail', f'/api/recipes/{recipe.id}/'),
+            ('recipe_get_link', f'/api/recipes/{recipe.id}/get-link/'),
+            ('short_link_redirect', f'/s/{encode(recipe.id)}'),
+            ('ingredients_search',
+             f'/api/ingredients/?name={quote(ingredient.name[:3])}'),
+            ('tags_list', '/api/tags/'),
+        )
+
+    def start_server(self, mode, port, workers):
+        server = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn',
+                '--config', 'gunicorn.conf.py',
+                '--bind', f'127.0.0.1:{port}',
+                '--workers', str(workers),
+            ],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'SERVER_MODE': mode},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port)
+                connection.request('GET', '/api/tags/')
+                if connection.getresponse().status == 200:
+                    return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'Сервер в режиме {mode} не запустился.')
+
+    @staticmethod
+    def load(port, path, headers, concurrency, duration):
+        """Запросы от concurrency клиентов в течение duration секунд."""
+        deadline = time.monotonic() + duration
+
+        def client():
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            timings, errors = [], 0
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                timings.append((time.perf_counter() - started) * 1000)
+                errors += response.status >= 400
+            connection.close()
+            return timings, errors
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(
+                lambda _: client(), range(concurrency)
+            ))
+        timings = [value for result in results for value in result[0]]
+        return {
+            'requests': len(timings),
+            'rps': round(len(timings) / duration, 1),
+            'errors': sum(result[1] for result in results),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'mean_ms': round(statistics.fmean(timings), 2),
+        }
+
+    @staticmethod
+    def compare(results):
+        lines = ['', 'ASGI относительно WSGI (запросов в секунду):']
+        for name, wsgi in results['wsgi'].items():
+            asgi = results['asgi'][name]
+            change = (asgi['rps'] / wsgi['rps'] - 1) * 100
+            lines.append(
+                f'{name:<22} {wsgi["rps"]:>9} -> {asgi["rps"]:>9} '
+                f'({change:+.0f}%)'
+            )
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _format_row(mode, name, result):
+        return (
+            f'{mode:<5} {name:<22} rps={result["rps"]:<8} '
+            f'p50={result["p50_ms"]:<8} p95={result["p95_ms"]:<8} '
+            f'errors={result["errors"]}'
+        )
@@ -0,0 +1,132 @@
+import json
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.views import RecipesViewSet
+from recipes.constants import PAGE_SIZE
+from recipes.models import Favorite, Recipes, ShoppingCart, Tags
+from users.models import Subscription, User
+
+WATCHED_MODELS = (Recipes, Recipes.tags.through, Favorite, ShoppingCart,
+                  Subscription)
+
+
+def plan_nodes(plan):
+    """Все узлы плана EXPLAIN (FORMAT JSON) в порядке обхода."""
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+class Command(BaseCommand):
+    """Проверка планов запросов ленты рецептов с фильтрами."""
+
+    help = ('Строит EXPLAIN для типовых сочетаний фильтров ленты рецептов '
+            'на текущих данных и завершается с ошибкой, если хоть один '
+            'план читает большую таблицу последовательным сканированием.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows', type=int, default=10_000,
+            help='Таблицы меньшего размера не проверяются.'
+        )
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Печатать полные планы запросов.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Проверка планов поддерживается только в '
+                               'PostgreSQL.')
+
+        watched = self.large_tables(options['min_rows'])
+        if not watched:
+            raise CommandError(
+                'Нет таблиц больше --min-rows, заполните базу командой '
+                'seed_benchmark_data.'
+            )
+
+        failures = []
+        for name, user, params in self.get_scenarios():
+            plan = json.loads(self.explain(user, params))[0]['Plan']
+            scans = sorted({
+                node['Relation Name'] for node in plan_nodes(plan)
+                if node['Node Type'] == 'Seq Scan'
+                and node['Relation Name'] in watched
+            })
+            if scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: Seq Scan по {", ".join(scans)}'
+                ))
+            else:
+                self.stdout.write(f'{name}: ok')
+            if options['verbose_plans']:
+                self.stdout.write(json.dumps(plan, indent=2))
+
+        if failures:
+            raise CommandError(
+                f'Последовательное сканирование в сценариях: '
+                f'{", ".join(failures)}'
+            )
+        self.stdout.write(self.style.SUCCESS('Все планы используют индексы.'))
+
+    @staticmethod
+    def large_tables(min_rows):
+        """Отслеживаемые таблицы с актуальной статистикой и их размер."""
+        tables = [model._meta.db_table for model in WATCHED_MODELS]
+        with connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+            cursor.execute(
+                'SELECT relname FROM pg_class '
+                'WHERE relname = ANY(%s) AND reltuples >= %s',
+                [tables, min_rows]
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    @staticmethod
+    def explain(user, params):
+        """План первой страницы ленты так, как её строит вьюсет."""
+        request = Request(APIRequestFactory().get('/api/recipes/', params))
+        request.user = user
+        view = RecipesViewSet(
+            request=request, action='list', args=(), kwargs={},
+            format_kwarg=None,
+        )
+        queryset = view.filter_queryset(view.get_queryset())
+        return queryset[:PAGE_SIZE].explain(format='json')
+
+    @staticmethod
+    def get_scenarios():
+        """Сочетания фильтров для самых активных пользователей и авторов."""
+        reader = User.objects.annotate(
+            total=Count('favorite', distinct=True)
+            + Count('shopping_list', distinct=True)
+        ).order_by('-total').first()
+        author = User.objects.order_by('-recipes_count').first()
+        slugs = list(
+            Tags.objects.order_by('id').values_list('slug', flat=True)
+        )
+        if reader is None or author is None or not slugs:
+            raise CommandError('В базе нет пользователей, рецептов или тегов.')
+
+        anonymous = AnonymousUser()
+        return (
+            ('feed', anonymous, {}),
+            ('feed_authenticated', reader, {}),
+            ('author', reader, {'author': author.id}),
+            ('tag', anonymous, {'tags': slugs[:1]}),
+            ('tags', reader, {'tags': slugs[:2]}),
+            ('author_tags', reader, {'author': author.id, 'tags': slugs[:2]}),
+            ('favorited', reader, {'is_favorited': 1}),
+            ('in_shopping_cart', reader, {'is_in_shopping_cart': 1}),
+            ('favorited_tags', reader,
+             {'is_favorited': 1, 'tags': slugs[:2]}),
+        )
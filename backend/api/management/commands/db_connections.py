@@ -0,0 +1,19 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.db_stats import connection_settings, server_stats
+
+
+class Command(BaseCommand):
+    """Состояние соединений с базой данных."""
+
+    help = ('Печатает настройки постоянных соединений и загрузку пула: '
+            'соединения с базой по состояниям и их долю от лимита.')
+
+    def handle(self, *args, **options):
+        report = {'settings': connection_settings()}
+        if connection.vendor == 'postgresql':
+            report['server'] = server_stats()
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
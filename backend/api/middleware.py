@@ -0,0 +1,223 @@
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from foodgram.metrics import (
+    REQUEST_DURATION,
+    REQUEST_QUERIES,
+    REQUESTS,
+    REQUESTS_IN_PROGRESS,
+    WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """Количество и время SQL-запросов обработки одного запроса.
+
+    Одинаковые по тексту запросы (с плейсхолдерами вместо параметров)
+    считаются повторами: так выглядит N+1 в сериализаторах.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def add(self, sql, duration):
+        self.duration += duration
+        self.count += 1
+        self.statements[sql] += 1
+
+    def duplicates(self, threshold):
+        return [
+            {'sql': sql[:200], 'count': count}
+            for sql, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+_recorders = ContextVar('query_recorders', default=())
+
+
+def _execute(execute, sql, params, many, context):
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        for recorder in recorders:
+            recorder.add(sql, duration)
+
+
+@receiver(connection_created)
+def watch_connection(sender, connection, **kwargs):
+    """Обёртка учёта запросов на каждом соединении с базой.
+
+    Соединения привязаны к потокам, а ORM из асинхронных вьюх
+    выполняется в потоках sync_to_async. Активные счётчики передаются
+    через контекстную переменную, которую asgiref копирует в эти потоки.
+    """
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+@contextmanager
+def record_queries(recorder):
+    """Учёт запросов текущего контекста в recorder."""
+    for connection in connections.all(initialized_only=True):
+        watch_connection(None, connection)
+    token = _recorders.set(_recorders.get() + (recorder,))
+    try:
+        yield
+    finally:
+        _recorders.reset(token)
+
+
+class RequestProfilingMiddleware:
+    """Профилирование выборки запросов.
+
+    Для доли запросов REQUEST_PROFILING_SAMPLE_RATE записывает время
+    обработки, количество и время SQL, повторяющиеся запросы и размер
+    ответа. Результат добавляется в заголовок Server-Timing и пишется
+    в лог одной JSON-строкой. При нулевой доле middleware отключается
+    при запуске и не влияет на обработку запросов. У потоковых ответов
+    размер и запросы, выполненные при отдаче тела, не учитываются.
+    Работает и в синхронной, и в асинхронной цепочке (SERVER_MODE=asgi)
+    без лишнего перехода между потоками.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.sample_rate = settings.REQUEST_PROFILING_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.duplicate_threshold = settings.REQUEST_PROFILING_DUPLICATES
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with record_queries(recorder):
+            response = self.get_response(request)
+        return self.report(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with record_queries(recorder):
+            response = await self.get_response(request)
+        return self.report(request, response, recorder, started)
+
+    def report(self, request, response, recorder, started):
+        """Заголовок Server-Timing и запись профиля запроса в лог."""
+        duration = (time.perf_counter() - started) * 1000
+        sql_duration = recorder.duration * 1000
+        duplicates = recorder.duplicates(self.duplicate_threshold)
+
+        response['Server-Timing'] = (
+            f'app;dur={duration:.1f}, '
+            f'db;dur={sql_duration:.1f};desc="{recorder.count} queries"'
+        )
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(duration, 2),
+            'queries': recorder.count,
+            'sql_ms': round(sql_duration, 2),
+            'duplicates': duplicates,
+            'response_bytes': (
+                None if response.streaming else len(response.content)
+            ),
+        }
+        logger.log(
+            logging.WARNING if duplicates else logging.INFO,
+            json.dumps(record, ensure_ascii=False)
+        )
+        return response
+
+
+class MetricsMiddleware:
+    """Метрики запросов для Prometheus.
+
+    Запросы, время обработки и количество SQL учитываются по имени
+    маршрута и действию вьюсета, например recipes-favorite и favorite.
+    Включается настройкой METRICS_ENABLED, как и профилирование,
+    поддерживает обе цепочки middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        WORKERS.inc()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = QueryRecorder()
+        started = time.perf_counter()
+        with REQUESTS_IN_PROGRESS.track_inprogress(), record_queries(queries):
+            response = self.get_response(request)
+        return self.observe(request, response, queries, started)
+
+    async def __acall__(self, request):
+        queries = QueryRecorder()
+        started = time.perf_counter()
+        with REQUESTS_IN_PROGRESS.track_inprogress(), record_queries(queries):
+            response = await self.get_response(request)
+        return self.observe(request, response, queries, started)
+
+    def observe(self, request, response, queries, started):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        if match is None:
+            view, action = 'unmatched', ''
+        else:
+            view = match.view_name or match.route
+            action = getattr(match.func, 'actions', {}).get(
+                request.method.lower(), ''
+            )
+        REQUESTS.labels(
+            request.method, view, action, response.status_code
+        ).inc()
+        REQUEST_DURATION.labels(request.method, view, action).observe(
+            duration
+        )
+        REQUEST_QUERIES.labels(view, action).observe(queries.count)
+        return response
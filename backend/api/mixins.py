@@ -0,0 +1,221 @@
+import hashlib
+
+from django.db.models import prefetch_related_objects
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag, urlencode
+from rest_framework.response import Response
+
+from recipes.recipe_cache import (
+    get_fragments,
+    get_list_page,
+    get_recipe,
+    list_generation,
+    recipe_versions,
+    set_fragments,
+    set_list_page,
+    set_recipe,
+)
+
+
+def catalogue_etag(entry, request):
+    """ETag ответа справочника с учётом параметров запроса."""
+    query = request.GET.urlencode()
+    if not query:
+        return entry.etag
+    return hashlib.md5(f'{entry.etag}?{query}'.encode()).hexdigest()
+
+
+def catalogue_not_modified(entry, etag, request):
+    """Ответ 304, если у клиента актуальная версия справочника."""
+    return get_conditional_response(
+        request, etag=quote_etag(etag), last_modified=entry.last_modified,
+    )
+
+
+def set_catalogue_headers(response, entry, etag):
+    response['ETag'] = quote_etag(etag)
+    response['Last-Modified'] = http_date(entry.last_modified)
+    response['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+def cache_origin(request):
+    """Схема и хост запроса, от которых зависят абсолютные ссылки."""
+    return f'{request.scheme}://{request.get_host()}'
+
+
+def list_cache_key(request, params):
+    """Ключ страницы списка по origin и значимым параметрам запроса."""
+    query = urlencode(sorted(
+        (param, sorted(request.GET.getlist(param)))
+        for param in params
+        if param in request.GET
+    ), doseq=True)
+    digest = hashlib.md5(
+        f'{cache_origin(request)}?{query}'.encode()
+    ).hexdigest()
+    return f'recipes:list:{digest}'
+
+
+class CatalogueCacheMixin:
+    """Отдача справочника из кэша с поддержкой условных запросов.
+
+    Полный список и отдельные записи берутся из снимка справочника,
+    отфильтрованные списки по-прежнему строятся вьюсетом. ETag зависит
+    от версии справочника и параметров запроса, поэтому повторный
+    запрос с If-None-Match получает 304 без обращения к базе. Без
+    общего кэша снимка нет, и запросы обрабатывает вьюсет по индексам.
+    """
+
+    catalogue = None
+
+    def _cached_response(self, request, build_response, fallback):
+        entry = self.catalogue.get()
+        if entry is None:
+            return fallback()
+        etag = catalogue_etag(entry, request)
+        response = (
+            catalogue_not_modified(entry, etag, request)
+            or build_response(entry)
+        )
+        return set_catalogue_headers(response, entry, etag)
+
+    def list(self, request, *args, **kwargs):
+        def fallback():
+            return super(CatalogueCacheMixin, self).list(
+                request, *args, **kwargs
+            )
+
+        def build_response(entry):
+            if request.query_params:
+                return fallback()
+            return Response(entry.data)
+
+        return self._cached_response(request, build_response, fallback)
+
+    def retrieve(self, request, *args, **kwargs):
+        def fallback():
+            return super(CatalogueCacheMixin, self).retrieve(
+                request, *args, **kwargs
+            )
+
+        def build_response(entry):
+            item = entry.by_id.get(_to_int(kwargs.get(self.lookup_field)))
+            if item is None:
+                raise Http404
+            return Response(item)
+
+        return self._cached_response(request, build_response, fallback)
+
+
+class AnonymousCacheMixin:
+    """Кэширование списка и карточек рецептов для анонимных запросов.
+
+    Ключ страницы списка строится из origin и отсортированных
+    параметров cache_query_params, остальные параметры на выдачу не
+    влияют и в ключ не попадают. Актуальность проверяется по версиям
+    рецептов (см. recipes.recipe_cache), поэтому попадание в кэш
+    обходится без запросов к базе.
+    """
+
+    cache_query_params = ()
+    search_param = 'search'
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+
+        key = list_cache_key(request, self.cache_query_params)
+        search = self.search_param in request.GET
+        data = get_list_page(key, search)
+        if data is not None:
+            return Response(data)
+
+        generation = list_generation(search)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_list_page(key, generation, self.page_versions, response.data)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe_id = _to_int(kwargs.get(self.lookup_field))
+        if request.user.is_authenticated or recipe_id is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        data = get_recipe(recipe_id, cache_origin(request))
+        if data is not None:
+            return Response(data)
+
+        version = recipe_versions([recipe_id])[recipe_id]
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_recipe(
+                recipe_id, cache_origin(request), version, response.data
+            )
+        return response
+
+
+class RecipeFragmentCacheMixin:
+    """Список рецептов для авторизованных из общих фрагментов.
+
+    Представление рецепта кэшируется целиком, а is_favorited,
+    is_in_shopping_cart и author.is_subscribed каждый раз берутся из
+    аннотаций страницы, поэтому фрагмент годится для любого
+    пользователя того же origin (ссылки на изображения абсолютные).
+    Связанные объекты догружаются только для рецептов, которых нет
+    в кэше. Вьюсет задаёт их в get_prefetches(). Версии рецептов
+    страницы остаются в page_versions для кэша страницы целиком.
+    """
+
+    page_versions = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.prefetch_related(None))
+        self.page_versions = recipe_versions([recipe.id for recipe in page])
+        return self.get_paginated_response(
+            self.serialize_page(page, self.page_versions)
+        )
+
+    def serialize_page(self, recipes, versions):
+        """Представления рецептов страницы по версиям, прочитанным заранее."""
+        origin = cache_origin(self.request)
+        fragments = get_fragments(versions, origin)
+        missing = [recipe for recipe in recipes if recipe.id not in fragments]
+        if missing:
+            prefetch_related_objects(missing, *self.get_prefetches())
+            built = {
+                item['id']: item
+                for item in self.get_serializer(missing, many=True).data
+            }
+            set_fragments(versions, built, origin)
+            fragments.update(built)
+        return [
+            self.personalize(fragments[recipe.id], recipe)
+            for recipe in recipes
+        ]
+
+    @staticmethod
+    def personalize(fragment, recipe):
+        """Фрагмент рецепта с полями текущего пользователя."""
+        return {
+            **fragment,
+            'author': {
+                **fragment['author'],
+                'is_subscribed': getattr(
+                    recipe, 'author_is_subscribed', False
+                ),
+            },
+            'is_favorited': getattr(recipe, 'is_favorited', False),
+            'is_in_shopping_cart': getattr(
+                recipe, 'is_in_shopping_cart', False
+            ),
+        }
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
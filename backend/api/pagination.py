@@ -1,11 +1,184 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from datetime import datetime
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+)
 
 from recipes.constants import MAX_PAGE_SIZE, PAGE_SIZE
 
 
+class CastomCursorPagination(CursorPagination):
+    """Класс для курсорного пагинатора без подсчёта общего количества
+
+    В отличие от CursorPagination DRF, которая сравнивает только первое
+    поле сортировки и пропускает совпадения через OFFSET, курсор хранит
+    значения всех полей cursor_ordering последней строки страницы.
+    Следующая страница выбирается сравнением кортежей, например для
+    ('-pub_date', '-id'): pub_date < p OR (pub_date = p AND id < i),
+    поэтому строки с одинаковой датой не теряются и не повторяются, а
+    стоимость страницы не зависит от числа совпадений. Последнее поле
+    сортировки должно быть уникальным.
+    """
+
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'cursor_ordering', ('-id',))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = None
+        if self.cursor is not None and self.cursor.position is not None:
+            position = self.decode_position(queryset.model, self.cursor)
+            queryset = queryset.filter(self.keyset(position, reverse))
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [_reverse_field(field) for field in ordering]
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return self.page
+
+    def keyset(self, position, reverse):
+        """Условие «строго после позиции» для кортежа полей сортировки.
+
+        Нестрогое условие на первое поле дублирует кортежное, чтобы
+        PostgreSQL читал индекс по сортировке с границы позиции.
+        """
+        conditions = []
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            if not equal:
+                bound = Q(**{f'{name}__{lookup}e': value})
+            conditions.append(Q(**equal, **{f'{name}__{lookup}': value}))
+            equal[name] = value
+        return bound & reduce(or_, conditions)
+
+    def decode_position(self, model, cursor):
+        """Значения полей сортировки из курсора."""
+        try:
+            values = json.loads(cursor.position)
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_position(self, instance):
+        values = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip('-'))
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            values.append(value)
+        return json.dumps(values)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self.encode_position(self.page[-1])
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=position)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self.encode_position(self.page[0])
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=position)
+        )
+
+
+def _reverse_field(field):
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
 class CastomPagePagination(PageNumberPagination):
-    """Класс для кастомного пагинатора"""
+    """Класс для кастомного пагинатора
+
+    При наличии параметра cursor включается курсорная пагинация по
+    полям cursor_ordering вьюсета: стоимость страницы не зависит от её
+    номера, а count в ответе не возвращается.
+    """
 
     page_size = PAGE_SIZE
     page_size_query_param = 'limit'
     max_page_size = MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = CastomCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request):
+        """Страница для асинхронных представлений.
+
+        Число строк и записи страницы читаются асинхронным ORM, номер
+        страницы, ссылки и формат ответа те же, что у paginate_queryset.
+        None означает, что страницу строит синхронный вьюсет: курсорная
+        пагинация или неверный номер страницы с ответом 404.
+        """
+        if self.cursor_query_param in request.query_params:
+            return None
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        try:
+            self.page = paginator.page(
+                self.get_page_number(request, paginator)
+            )
+        except InvalidPage:
+            return None
+        self.request = request
+        return [item async for item in self.page.object_list]
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,12 +1,15 @@
 from django.contrib.auth import password_validation
 from django.core.validators import MinValueValidator
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, TokenCreateSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import exceptions, serializers
 
+from api.fields import ImageVariantsField, StreamingBase64ImageField
 from api.pagination import CastomPagePagination
 from recipes.constants import (
+    BULK_MAX_ITEMS,
+    MAX_ID,
     NAME_ME,
 )
 from recipes.models import (
@@ -17,6 +20,11 @@ from recipes.models import (
     ShoppingCart,
     Tags,
 )
+from recipes.search import update_search_vectors
+from recipes.shopping_list import (
+    change_recipe_in_shopping_lists,
+    lock_recipes,
+)
 from users.models import (
     User,
     Subscription,
@@ -63,7 +71,7 @@ class PasswordSerializer(serializers.Serializer):
 class AvatarSerializer(serializers.ModelSerializer):
     """Сериализатор для аватара."""
 
-    avatar = Base64ImageField()
+    avatar = StreamingBase64ImageField()
 
     class Meta:
         model = User
@@ -79,13 +87,14 @@ class AvatarSerializer(serializers.ModelSerializer):
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для модели User."""
 
-    avatar = Base64ImageField(required=False, allow_null=True)
+    avatar = StreamingBase64ImageField(required=False, allow_null=True)
+    avatar_variants = ImageVariantsField()
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = ('id', 'email', 'username', 'first_name',
-                  'last_name', 'is_subscribed', 'avatar')
+                  'last_name', 'is_subscribed', 'avatar', 'avatar_variants')
 
     def validate_username(self, username):
         if username == NAME_ME:
@@ -96,6 +105,8 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         """Получение списка подписок."""
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return Subscription.objects.filter(
@@ -119,6 +130,16 @@ class FavoriteSerializer(serializers.ModelSerializer):
         fields = ('user', 'recipes',)
 
 
+class BulkIdsSerializer(serializers.Serializer):
+    """Список id для пакетного добавления или удаления."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=MAX_ID),
+        allow_empty=False,
+        max_length=BULK_MAX_ITEMS,
+    )
+
+
 class ShoppingCartSerializer(serializers.ModelSerializer):
     """Сериалайзер модели корзина покупок."""
 
@@ -159,9 +180,11 @@ class IngredientsSerializer(serializers.ModelSerializer):
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """Класс для рецептов, но укороченный"""
 
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipes
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class SubscriptionSerializer(UserSerializer, CastomPagePagination):
@@ -172,8 +195,10 @@ class SubscriptionSerializer(UserSerializer, CastomPagePagination):
     username = serializers.ReadOnlyField(source='author.username')
     first_name = serializers.ReadOnlyField(source='author.first_name')
     last_name = serializers.ReadOnlyField(source='author.last_name')
+    avatar = serializers.ImageField(source='author.avatar', read_only=True)
+    avatar_variants = ImageVariantsField(source='author.avatar_variants')
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(read_only=True)
+    recipes_count = serializers.ReadOnlyField(source='author.recipes_count')
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -188,34 +213,40 @@ class SubscriptionSerializer(UserSerializer, CastomPagePagination):
             'recipes',
             'recipes_count',
             'avatar',
+            'avatar_variants',
         )
 
-    def to_representation(self, instance):
-        """Добавление аннотированных полей к сериализованному представлению."""
-        representation = super().to_representation(instance)
-        representation['recipes_count'] = getattr(
-            instance, 'recipes_count', 0
-        )
-
-        return representation
-
-    def get_recipes(self, obj):
-        """Получение списка рецептов автора."""
-        request = self.context.get('request')
+    @staticmethod
+    def recipes_queryset(request, **filters):
+        """Последние рецепты автора с учётом recipes_limit."""
         limit = request.GET.get('recipes_limit')
-        recipes = Recipes.objects.filter(author=obj.author)
+        recipes = Recipes.objects.filter(**filters).only(
+            'id', 'name', 'image', 'image_variants', 'cooking_time', 'author'
+        ).order_by('-pub_date', '-id')
         if limit and limit.isdigit():
             recipes = recipes[:int(limit)]
+        return recipes
+
+    def get_recipes(self, obj):
+        """Получение списка рецептов автора.
+
+        Во вьюсете рецепты всех авторов страницы загружаются одним
+        оконным запросом в latest_recipes.
+        """
+        recipes = getattr(obj.author, 'latest_recipes', None)
+        if recipes is None:
+            recipes = self.recipes_queryset(
+                self.context.get('request'), author=obj.author
+            )
         return ShortRecipeSerializer(recipes, many=True).data
 
     def get_is_subscribed(self, obj):
-        """Подписчики"""
+        """Подписка принадлежит текущему пользователю."""
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Subscription.objects.filter(
-                user=request.user, author=obj.author
-            ).exists()
-        return False
+        return bool(
+            request and request.user.is_authenticated
+            and obj.user_id == request.user.id
+        )
 
 
 class RecipeIngredientsSerializer(serializers.ModelSerializer):
@@ -235,7 +266,7 @@ class RecipeIngredientsSerializer(serializers.ModelSerializer):
 class CreateUpdateRecipeIngredientsSerializer(serializers.ModelSerializer):
     """Класс создания и обновления ингридиентов в рецептах"""
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredients.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         validators=(
             MinValueValidator(
@@ -257,22 +288,26 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients = serializers.SerializerMethodField()
     is_favorited = serializers.BooleanField(read_only=True)
     is_in_shopping_cart = serializers.BooleanField(read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipes
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time')
+                  'name', 'image', 'image_variants', 'text', 'cooking_time',
+                  'favorites_count', 'in_carts_count')
 
     def get_ingredients(self, obj):
         """Получение ингридиентов."""
-        ingredients = IngredientsRecipes.objects.filter(recipes=obj)
+        ingredients = obj.ingredientsrecipes_set.all()
         serializer = RecipeIngredientsSerializer(ingredients, many=True)
 
         return serializer.data
 
     def to_representation(self, instance):
         """Добавление аннотированных полей к сериализованному представлению."""
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
         representation = super().to_representation(instance)
         representation['is_favorited'] = getattr(
             instance, 'is_favorited', False
@@ -291,7 +326,7 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
     )
     author = UserSerializer(read_only=True)
     ingredients = CreateUpdateRecipeIngredientsSerializer(many=True)
-    image = Base64ImageField()
+    image = StreamingBase64ImageField()
     cooking_time = serializers.IntegerField(
         validators=(
             MinValueValidator(
@@ -328,14 +363,23 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             )
 
         ingredients = [item['id'] for item in value]
-        for ingredient in ingredients:
-            if ingredients.count(ingredient) > 1:
-                raise exceptions.ValidationError(
-                    'Рецепт не может включать два одинаковых ингредиента!'
-                )
+        if len(ingredients) != len(set(ingredients)):
+            raise exceptions.ValidationError(
+                'Рецепт не может включать два одинаковых ингредиента!'
+            )
+
+        existing = set(Ingredients.objects.filter(
+            pk__in=ingredients
+        ).values_list('pk', flat=True))
+        missing = [pk for pk in ingredients if pk not in existing]
+        if missing:
+            raise exceptions.ValidationError(
+                f'Ингредиенты не найдены: {", ".join(map(str, missing))}.'
+            )
 
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         """Создание."""
         author = self.context.get('request').user
@@ -344,9 +388,11 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
 
         recipes = Recipes.objects.create(author=author, **validated_data)
         self._set_tags_and_ingredients(recipes, tags, ingredients)
+        update_search_vectors([recipes.id])
 
         return recipes
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Обновление."""
         if 'ingredients' not in validated_data:
@@ -354,35 +400,75 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         elif 'tags' not in validated_data:
             raise exceptions.ValidationError('Добавьте теги')
 
-        tags = validated_data.pop('tags', None)
-        ingredients = validated_data.pop('ingredients', None)
-
-        if tags is not None:
-            instance.tags.set(tags)
+        tags = validated_data.pop('tags')
+        ingredients = validated_data.pop('ingredients')
 
-        if ingredients is not None:
-            self._set_tags_and_ingredients(instance, tags, ingredients)
+        lock_recipes((instance.id,))
+        self._set_tags_and_ingredients(instance, tags, ingredients)
+        instance = super().update(instance, validated_data)
+        update_search_vectors([instance.id])
 
-        return super().update(instance, validated_data)
+        return instance
 
     def _set_tags_and_ingredients(self, recipe_instance, tags, ingredients):
-        """Устанавливает теги и ингредиенты для рецепта."""
-        recipe_instance.tags.set(tags)
-        recipe_instance.ingredients.clear()
+        """Устанавливает теги и ингредиенты для рецепта.
 
-        for ingredient in ingredients:
-            amount = ingredient.get('amount')
-            ingredient_instance = get_object_or_404(
-                Ingredients, pk=ingredient.get('id').id
+        Строки ингредиентов обновляются по разнице с текущим составом:
+        удалённые удаляются, изменённые обновляются, новые создаются
+        одним запросом на каждую операцию.
+        """
+        recipe_instance.tags.set(tags)
+        current = {
+            row.ingredient_id: row
+            for row in IngredientsRecipes.objects.filter(
+                recipes=recipe_instance
             )
-
-            IngredientsRecipes.objects.update_or_create(
+        }
+        old_ingredients = {
+            ingredient_id: row.amount for ingredient_id, row in current.items()
+        }
+        new_ingredients = {item['id']: item['amount'] for item in ingredients}
+
+        removed = current.keys() - new_ingredients.keys()
+        if removed:
+            IngredientsRecipes.objects.filter(
+                recipes=recipe_instance, ingredient_id__in=removed
+            ).delete()
+
+        changed = []
+        for ingredient_id, amount in new_ingredients.items():
+            row = current.get(ingredient_id)
+            if row is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            IngredientsRecipes.objects.bulk_update(changed, ('amount',))
+
+        IngredientsRecipes.objects.bulk_create(
+            IngredientsRecipes(
                 recipes=recipe_instance,
-                ingredient=ingredient_instance,
-                defaults={'amount': amount},
+                ingredient_id=ingredient_id,
+                amount=amount,
             )
+            for ingredient_id, amount in new_ingredients.items()
+            if ingredient_id not in current
+        )
+
+        change_recipe_in_shopping_lists(
+            recipe_instance.id, old_ingredients, new_ingredients
+        )
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'ingredientsrecipes_set',
+                queryset=IngredientsRecipes.objects.select_related(
+                    'ingredient'
+                ),
+            ),
+        )
         serializer = RecipeSerializer(
             instance, context={'request': self.context.get('request')}
         )
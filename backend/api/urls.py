@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
+from api import async_views
 from api.views import (
     IngredientsViewSet,
     RecipesViewSet,
@@ -21,3 +23,20 @@ urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+async_urlpatterns = [
+    path('recipes/', async_views.recipe_list, name='recipes-list'),
+    path('recipes/<int:pk>/', async_views.recipe_detail,
+         name='recipes-detail'),
+    path('recipes/<int:pk>/get-link/', async_views.recipe_get_link,
+         name='recipes-get_link'),
+    path('ingredients/', async_views.ingredient_list,
+         name='ingredients-list'),
+    path('ingredients/<int:pk>/', async_views.ingredient_detail,
+         name='ingredients-detail'),
+    path('tags/', async_views.tag_list, name='tags-list'),
+    path('tags/<int:pk>/', async_views.tag_detail, name='tags-detail'),
+]
+
+if settings.SERVER_MODE == 'asgi':
+    urlpatterns = async_urlpatterns + urlpatterns
@@ -1,21 +1,31 @@
-import os
-
-from django.db.models import Count, Exists, OuterRef, Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST
 from rest_framework import filters, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from api.db_stats import DatabaseCollector
 from api.filters import IngredientsFilter, RecipeFilter
+from api.mixins import (
+    AnonymousCacheMixin,
+    CatalogueCacheMixin,
+    RecipeFragmentCacheMixin,
+)
 from api.pagination import CastomPagePagination
 from api.permissins import IsAdminAuthorOrReadOnly, IsUserorAdmin
 from api.serializers import (
     AvatarSerializer,
+    BulkIdsSerializer,
     CustomUserCreateSerializer,
-    FavoriteSerializer,
     IngredientsSerializer,
     PasswordSerializer,
     RecipeSerializer,
@@ -26,52 +36,85 @@ from api.serializers import (
     TagsSerializer,
     UserSerializer,
 )
-from recipes.constants import INCORRECT_PASSWORD
-from recipes.download_shopping_cart import shopping_list_file
+from foodgram.metrics import render as render_metrics
+from recipes.catalogue import ingredients_catalogue, tags_catalogue
+from recipes.constants import (
+    INCORRECT_PASSWORD,
+    SHOPPING_LIST_CHUNK_SIZE,
+    SHOPPING_LIST_FORMAT_PARAM,
+)
+from recipes.counters import change_counter
+from recipes.download_shopping_cart import SHOPPING_LIST_FORMATS
 from recipes.models import (
     Favorite,
     Ingredients,
     IngredientsRecipes,
     Recipes,
     ShoppingCart,
+    ShoppingListItem,
     Tags,
 )
+from recipes.recipe_cache import invalidate_recipes
+from recipes.relations import delete_relations, insert_relations
+from recipes.shopping_list import (
+    add_recipes_to_shopping_list,
+    remove_recipes_from_shopping_list,
+)
+from recipes.short_links import decode, known_recipes, short_link
 from users.models import Subscription, User
 
 
-load_dotenv()
-
-
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(CatalogueCacheMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для ингридиентов."""
 
-    queryset = Ingredients.objects.all()
+    catalogue = ingredients_catalogue
+    queryset = Ingredients.objects.order_by('id')
     serializer_class = IngredientsSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientsFilter
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(AnonymousCacheMixin, RecipeFragmentCacheMixin,
+                     viewsets.ModelViewSet):
     """Вьюсет для рецептов."""
 
     permission_classes = (IsAdminAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     pagination_class = CastomPagePagination
+    cursor_ordering = ('-pub_date', '-id')
+    cache_query_params = ('author', 'tags', 'search', 'page', 'limit',
+                          'cursor')
 
     def get_queryset(self):
         """Добавление is_favorited и is_in_shopping_cart в get_queryset."""
         user = self.request.user
-        queryset = Recipes.objects.all()
+        queryset = Recipes.objects.select_related('author').prefetch_related(
+            *self.get_prefetches()
+        )
 
         if user.is_authenticated:
             queryset = queryset.annotate(
                 is_favorited=Exists(Favorite.objects.filter(
                     user=user, recipes=OuterRef('pk'))),
                 is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
-                    author=user, recipes=OuterRef('pk')))
+                    author=user, recipes=OuterRef('pk'))),
+                author_is_subscribed=Exists(Subscription.objects.filter(
+                    user=user, author=OuterRef('author')))
             )
-        return queryset.order_by('-pub_date')
+        return queryset.order_by('-pub_date', '-id')
+
+    def get_prefetches(self):
+        """Связанные объекты, нужные RecipeSerializer."""
+        return (
+            'tags',
+            Prefetch(
+                'ingredientsrecipes_set',
+                queryset=IngredientsRecipes.objects.select_related(
+                    'ingredient'
+                ),
+            ),
+        )
 
     def get_serializer_class(self):
         """Условие для выбора сериализатора."""
@@ -79,36 +122,60 @@ class RecipesViewSet(viewsets.ModelViewSet):
             return RecipeCreateUpdateSerializer
         return RecipeSerializer
 
-    def add(self, model, user, pk, name):
-        """Добавление рецепта."""
-        recipes = get_object_or_404(Recipes, pk=pk)
-        relation = model.objects.filter(user=user, recipes=recipes)
-        if relation.exists():
-            return Response(
-                f'Нельзя повторно добавить рецепт в {name}',
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        serializer = FavoriteSerializer(
-            data={'user': user.id, 'recipes': recipes.id}
-        )
+    def change_relations(self, model, user_field, counter, recipe_ids,
+                         add):
+        """Добавление или удаление рецептов из списка пользователя.
+
+        Связи вставляются через ON CONFLICT DO NOTHING и удаляются
+        с RETURNING, поэтому счётчик меняется ровно на число строк,
+        изменённых этим запросом, а карточки изменённых рецептов
+        сбрасываются в кэше. Строки рецептов блокируются по порядку
+        id (FOR NO KEY UPDATE не мешает проверкам внешних ключей), чтобы
+        одновременные пакетные запросы обновляли счётчики без взаимных
+        блокировок. Возвращает найденные рецепты {id: рецепт} и id
+        изменённых.
+        """
+        user = self.request.user
+        with transaction.atomic():
+            recipes = Recipes.objects.select_for_update(no_key=True).filter(
+                pk__in=recipe_ids
+            ).only(
+                'id', 'name', 'image', 'image_variants', 'cooking_time'
+            ).order_by('pk')
+            found = {recipe.id: recipe for recipe in recipes}
+            write = insert_relations if add else delete_relations
+            changed = write(model, user_field, user.id, 'recipes', found)
+            if changed:
+                change_counter(Recipes, counter, changed, 1 if add else -1)
+                invalidate_recipes(changed, lists=False)
+                if model is ShoppingCart:
+                    if add:
+                        add_recipes_to_shopping_list(user, changed)
+                    else:
+                        remove_recipes_from_shopping_list(user, changed)
+        return found, changed
+
+    def bulk_relations(self, request, model, user_field, counter):
+        """Пакетное изменение списка с результатом по каждому рецепту."""
+        serializer = BulkIdsSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(
-            ShortRecipeSerializer(recipes).data,
-            status=status.HTTP_201_CREATED
+        recipe_ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        add = request.method == 'POST'
+        found, changed = self.change_relations(
+            model, user_field, counter, recipe_ids, add
         )
-
-    def delete_relation(self, model, user, pk, name):
-        """Удаление рецепта из списка пользователя."""
-        deleted_count, _ = model.objects.filter(
-            user=user, recipes__id=pk
-        ).delete()
-        if deleted_count == 0:
-            return Response(
-                f'Нельзя повторно удалить рецепт из {name}',
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        if add:
+            done, skipped = 'created', 'already_added'
+        else:
+            done, skipped = 'deleted', 'not_in_list'
+        results = []
+        for recipe_id in recipe_ids:
+            if recipe_id not in found:
+                result = 'not_found'
+            else:
+                result = done if recipe_id in changed else skipped
+            results.append({'id': recipe_id, 'status': result})
+        return Response({'results': results}, status=status.HTTP_200_OK)
 
     @action(
         detail=True,
@@ -118,72 +185,109 @@ class RecipesViewSet(viewsets.ModelViewSet):
     )
     def favorite(self, request, pk=None):
         """Добавление и удаление рецептов из избранного."""
-        user = request.user
-        if request.method == 'POST':
-            name = 'избранное'
-            return self.add(Favorite, user, pk, name)
-        if request.method == 'DELETE':
-            name = 'избранного'
-            return self.delete_relation(Favorite, user, pk, name)
-        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        add = request.method == 'POST'
+        found, changed = self.change_relations(
+            Favorite, 'user', 'favorites_count', [pk], add
+        )
+        if add and not found:
+            raise Http404
+        if not changed:
+            if add:
+                message = 'Нельзя повторно добавить рецепт в избранное'
+            else:
+                message = 'Нельзя повторно удалить рецепт из избранного'
+            return Response(message, status=status.HTTP_400_BAD_REQUEST)
+        if add:
+            return Response(
+                ShortRecipeSerializer(found[int(pk)]).data,
+                status=status.HTTP_201_CREATED
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True,
             methods=('post', 'delete'),
             permission_classes=[permissions.IsAuthenticated])
-    def shopping_cart(self, request, **kwargs):
+    def shopping_cart(self, request, pk=None):
         """Добавить или удалить рецепт из списка покупок у пользоватeля."""
-        user = self.request.user
-        if request.method == 'POST':
-            recipes = get_object_or_404(Recipes, id=self.kwargs.get('pk'))
-            if ShoppingCart.objects.filter(
-                author=user,
-                recipes=recipes
-            ).exists():
-                return Response(
-                    'Рецепт уже добавлен!',
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            serializer = ShoppingCartSerializer(data=request.data)
-            if serializer.is_valid(raise_exception=True):
-                serializer.save(author=user, recipes=recipes)
-                return Response(
-                    serializer.data, status=status.HTTP_201_CREATED)
+        add = request.method == 'POST'
+        found, changed = self.change_relations(
+            ShoppingCart, 'author', 'in_carts_count', [pk], add
+        )
+        if add and not found:
+            raise Http404
+        if not changed:
             return Response(
-                serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                'Рецепт уже добавлен!' if add
+                else 'Рецепт не найден в корзине.',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if add:
+            serializer = ShoppingCartSerializer(
+                ShoppingCart(author=request.user, recipes=found[int(pk)])
+            )
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(
+            'Рецепт успешно удалён из списка покупок.',
+            status=status.HTTP_204_NO_CONTENT
+        )
 
-        if request.method == 'DELETE':
-            deleted_count, _ = ShoppingCart.objects.filter(
-                author=user, recipes=self.kwargs.get('pk')).delete()
-            if deleted_count == 0:
-                return Response(
-                    'Рецепт не найден в корзине.',
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        url_path='favorite',
+        url_name='favorite-bulk',
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def favorite_bulk(self, request):
+        """Добавление или удаление списка рецептов в избранном."""
+        return self.bulk_relations(
+            request, Favorite, 'user', 'favorites_count'
+        )
 
-            return Response(
-                'Рецепт успешно удалён из списка покупок.',
-                status=status.HTTP_204_NO_CONTENT
-            )
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def shopping_cart_bulk(self, request):
+        """Добавление или удаление списка рецептов в корзине."""
+        return self.bulk_relations(
+            request, ShoppingCart, 'author', 'in_carts_count'
+        )
 
     @action(detail=False,
             methods=('get',),
             permission_classes=[permissions.IsAuthenticated])
     def download_shopping_cart(self, request):
         """Скачать список покупок."""
-        ingredients = IngredientsRecipes.objects.filter(
-            recipes__in=ShoppingCart.objects.filter(
-                author=self.request.user).values('recipes')
+        file_format = request.query_params.get(
+            SHOPPING_LIST_FORMAT_PARAM, 'txt'
+        )
+        if file_format not in SHOPPING_LIST_FORMATS:
+            return Response(
+                f'Доступные форматы: {", ".join(SHOPPING_LIST_FORMATS)}.',
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        content_type, file_generator = SHOPPING_LIST_FORMATS[file_format]
+
+        ingredients = ShoppingListItem.objects.filter(
+            user=self.request.user
         ).values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            total_amount=F('amount'),
+        ).order_by(
             'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(
-            total_amount=Sum('amount')
         )
 
-        file_name = 'shopping_list.txt'
-        content_type = 'text/plain,charset=utf8'
-        response = HttpResponse(
-            shopping_list_file(ingredients), content_type=content_type
+        file_name = f'shopping_list.{file_format}'
+        response = StreamingHttpResponse(
+            file_generator(
+                ingredients.iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+            ),
+            content_type=content_type
         )
         response['Content-Disposition'] = f'attachment; filename={file_name}'
         return response
@@ -196,15 +300,19 @@ class RecipesViewSet(viewsets.ModelViewSet):
     )
     def get_link(self, request, pk=None):
         """Получение короткой ссылки на рецепт."""
-        recipes = get_object_or_404(Recipes, pk=pk)
-        short_link = f'{os.getenv("DOMAIN")}/recipes/{recipes.id}'
-        return Response({'short-link': short_link}, status=status.HTTP_200_OK)
+        if not str(pk).isdigit() or not known_recipes.exists(int(pk)):
+            raise Http404
+        return Response(
+            {'short-link': short_link(int(pk))},
+            status=status.HTTP_200_OK
+        )
 
 
-class TagsViewSet(viewsets.ModelViewSet):
+class TagsViewSet(CatalogueCacheMixin, viewsets.ModelViewSet):
     """Вьюсет для тегов."""
 
-    queryset = Tags.objects.all()
+    catalogue = tags_catalogue
+    queryset = Tags.objects.order_by('id')
     serializer_class = TagsSerializer
     permission_classes = (IsUserorAdmin,)
     http_method_names = ('get',)
@@ -216,6 +324,7 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.order_by('id')
     permission_classes = (IsUserorAdmin, )
     pagination_class = CastomPagePagination
+    cursor_ordering = ('id',)
     filter_backends = (filters.SearchFilter, )
     filterset_fields = ('id',)
     search_fields = ('id', )
@@ -319,15 +428,41 @@ class UserViewSet(viewsets.ModelViewSet):
     def subscriptions(self, request):
         """Список авторов, на которых подписан пользователь."""
         user = self.request.user
-        queryset = user.follower.annotate(
-            recipes_count=Count('author__recipes')
-        )
+        queryset = user.follower.select_related('author').prefetch_related(
+            Prefetch(
+                'author__recipes',
+                queryset=SubscriptionSerializer.recipes_queryset(request),
+                to_attr='latest_recipes',
+            )
+        ).order_by('id')
         pages = self.paginate_queryset(queryset)
         serializer = SubscriptionSerializer(
             pages, many=True, context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
 
+    def change_subscriptions(self, author_ids, add):
+        """Подписка на авторов или отписка от них.
+
+        Как и для списков рецептов, подписки вставляются через
+        ON CONFLICT DO NOTHING и удаляются с RETURNING, а строки авторов
+        блокируются по порядку id. Возвращает найденных авторов
+        {id: автор} и id изменённых.
+        """
+        user = self.request.user
+        with transaction.atomic():
+            authors = User.objects.select_for_update(no_key=True).filter(
+                pk__in=author_ids
+            ).exclude(pk=user.pk).order_by('pk')
+            found = {author.id: author for author in authors}
+            write = insert_relations if add else delete_relations
+            changed = write(Subscription, 'user', user.id, 'author', found)
+            if changed:
+                change_counter(
+                    User, 'subscribers_count', changed, 1 if add else -1
+                )
+        return found, changed
+
     @action(
         detail=True,
         methods=('post', 'delete'),
@@ -336,32 +471,68 @@ class UserViewSet(viewsets.ModelViewSet):
     def subscribe(self, request, id=None):
         """Подписка."""
         user = self.request.user
-        if self.request.method == 'POST':
-            author = get_object_or_404(User, pk=id)
-            if user == author:
-                return Response(
-                    'Нельзя подписаться самому на себя)',
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            if Subscription.objects.filter(user=user, author=author).exists():
-                return Response(
-                    'Подписка уже существует.',
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            subscription = Subscription.objects.create(
-                author=author, user=user)
+        add = self.request.method == 'POST'
+        if add and str(user.pk) == str(id):
+            return Response(
+                'Нельзя подписаться самому на себя)',
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        found, changed = self.change_subscriptions([id], add)
+        if add and not found:
+            raise Http404
+        if not changed:
+            return Response(
+                'Подписка уже существует.' if add else 'Вы не подписаны',
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if add:
             serializer = SubscriptionSerializer(
-                subscription, context={"request": request})
+                Subscription(user=user, author=found[int(id)]),
+                context={'request': request}
+            )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-        elif self.request.method == 'DELETE':
-            deleted_count, _ = Subscription.objects.filter(
-                user=user, author=id
-            ).delete()
-            if deleted_count == 0:
-                return Response(
-                    'Вы не подписаны',
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            return Response(status=status.HTTP_204_NO_CONTENT)
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        url_path='subscribe',
+        url_name='subscribe-bulk',
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def subscribe_bulk(self, request):
+        """Подписка на список авторов или отписка от них."""
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        author_ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        add = request.method == 'POST'
+        found, changed = self.change_subscriptions(author_ids, add)
+        if add:
+            done, skipped = 'created', 'already_subscribed'
+        else:
+            done, skipped = 'deleted', 'not_subscribed'
+        results = []
+        for author_id in author_ids:
+            if author_id == request.user.pk:
+                result = 'self'
+            elif author_id not in found:
+                result = 'not_found'
+            else:
+                result = done if author_id in changed else skipped
+            results.append({'id': author_id, 'status': result})
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+def short_link_redirect(request, code):
+    """Переход по короткой ссылке на страницу рецепта."""
+    recipe_id = decode(code)
+    if recipe_id is None or not known_recipes.exists(recipe_id):
+        raise Http404
+    return HttpResponseRedirect(f'/recipes/{recipe_id}')
+
+
+def metrics(request):
+    """Метрики в текстовом формате Prometheus."""
+    return HttpResponse(
+        render_metrics(DatabaseCollector()), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,73 @@
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+REQUESTS = Counter(
+    'foodgram_http_requests',
+    'Запросы по маршруту, действию вьюсета и статусу ответа.',
+    ('method', 'view', 'action', 'status'),
+)
+REQUEST_DURATION = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Время обработки запроса.',
+    ('method', 'view', 'action'),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    'foodgram_http_request_db_queries',
+    'Количество SQL-запросов на один запрос.',
+    ('view', 'action'),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'foodgram_http_requests_in_progress',
+    'Запросы в обработке во всех воркерах.',
+    multiprocess_mode='livesum',
+)
+WORKERS = Gauge(
+    'foodgram_workers',
+    'Живые воркеры; загрузка - requests_in_progress / workers.',
+    multiprocess_mode='livesum',
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests',
+    'Обращения к кэшам ответов по результату: hit или miss.',
+    ('cache', 'result'),
+)
+DB_CONNECTIONS_OPENED = Counter(
+    'foodgram_db_connections_opened',
+    'Открытые соединения с базой данных.',
+)
+
+
+def cache_result(cache, hits, misses=0):
+    """Учёт попаданий и промахов кэша."""
+    if hits:
+        CACHE_REQUESTS.labels(cache, 'hit').inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache, 'miss').inc(misses)
+
+
+def render(*collectors):
+    """Метрики всех воркеров в текстовом формате Prometheus.
+
+    Если задан PROMETHEUS_MULTIPROC_DIR, значения собираются из файлов
+    всех воркеров gunicorn, иначе - из памяти текущего процесса.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    extra = CollectorRegistry()
+    for collector in collectors:
+        extra.register(collector)
+    return generate_latest(registry) + generate_latest(extra)
@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework.authtoken',
     'rest_framework',
     'djoser',
@@ -33,6 +34,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,6 +65,15 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+# время жизни соединения с БД в секундах: 0 - новое соединение на каждый
+# запрос, none - без ограничения; перед повторным использованием
+# соединение проверяется, если включён DB_CONN_HEALTH_CHECKS
+DB_CONN_MAX_AGE = os.getenv('DB_CONN_MAX_AGE', '60').lower()
+# pgbouncer - соединения идут через PgBouncer (DB_HOST=pgbouncer), размер
+# пула задаётся в нём переменной PGBOUNCER_POOL_SIZE
+DB_POOLER = os.getenv('DB_POOLER', '')
+DB_POOL_SIZE = int(os.getenv('PGBOUNCER_POOL_SIZE', 20))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -69,10 +81,40 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'foodgram_user'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', 'db'),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': (
+            None if DB_CONN_MAX_AGE == 'none' else int(DB_CONN_MAX_AGE)
+        ),
+        'CONN_HEALTH_CHECKS': (
+            os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true'
+        ),
+        # PgBouncer в режиме transaction не сохраняет курсоры между
+        # транзакциями
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOLER == 'pgbouncer',
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+        },
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
+# Кэши ответов сбрасываются через кэш Django: кэш в памяти процесса виден
+# только своему воркеру, поэтому при нескольких воркерах кэши ответов
+# включаются только с общим бэкендом (redis, memcached, БД).
+RESPONSE_CACHE_ENABLED = (
+    CACHES['default']['BACKEND']
+    != 'django.core.cache.backends.locmem.LocMemCache'
+    or int(os.getenv('GUNICORN_WORKERS', 1)) <= 1
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -135,4 +177,54 @@ DJOSER = {
 
 }
 
-CSRF_TRUSTED_ORIGINS = [os.getenv('DOMAIN')]
+# адрес сайта для коротких ссылок, читается один раз при запуске
+DOMAIN = os.getenv('DOMAIN', '').rstrip('/')
+
+CSRF_TRUSTED_ORIGINS = [DOMAIN] if DOMAIN else []
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+# потоки обработки изображений в каждом веб-воркере; 0 - копии строит
+# отдельный процесс build_image_variants --watch (сервис image_worker)
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+
+# wsgi - gunicorn с синхронными воркерами, asgi - воркеры uvicorn
+# и асинхронные представления для чтения рецептов и справочников
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
+# профилирование: доля запросов от 0 до 1, для которых пишутся время,
+# SQL и размер ответа; 0 - middleware выключен. Запрос, повторённый
+# REQUEST_PROFILING_DUPLICATES раз, отмечается как N+1
+REQUEST_PROFILING_SAMPLE_RATE = float(
+    os.getenv('REQUEST_PROFILING_SAMPLE_RATE', 0)
+)
+REQUEST_PROFILING_DUPLICATES = int(
+    os.getenv('REQUEST_PROFILING_DUPLICATES', 3)
+)
+
+# метрики Prometheus на /metrics; при нескольких воркерах gunicorn
+# значения собираются через каталог PROMETHEUS_MULTIPROC_DIR
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.middleware': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'recipes': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
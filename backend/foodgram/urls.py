@@ -3,11 +3,17 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from api.views import metrics, short_link_redirect
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    path('s/<str:code>', short_link_redirect, name='short_link'),
 ]
 
+if settings.METRICS_ENABLED:
+    urlpatterns.append(path('metrics', metrics, name='metrics'))
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,
                           document_root=settings.MEDIA_ROOT)
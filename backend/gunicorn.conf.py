@@ -0,0 +1,25 @@
+import os
+import shutil
+
+bind = '0.0.0.0:8000'
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'foodgram.asgi:application'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+
+if os.getenv('METRICS_ENABLED', 'false').lower() == 'true':
+    # общий каталог для метрик всех воркеров, очищается при запуске
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus')
+
+    def on_starting(server):
+        directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+    def child_exit(server, worker):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
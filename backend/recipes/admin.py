@@ -7,8 +7,27 @@ from recipes.models import (
     IngredientsRecipes,
     Recipes,
     ShoppingCart,
+    ShoppingListItem,
     Tags,
 )
+from recipes.search import update_search_vectors
+from recipes.shopping_list import sync_shopping_lists
+
+
+class CountedRelationAdmin(admin.ModelAdmin):
+    """Строка, учтённая в счётчиках: связь после создания не меняется.
+
+    Счётчики пересчитываются при создании и удалении строк, поэтому
+    перенос связи на другой объект в админке запрещён.
+    """
+
+    counted_fields = ()
+
+    def get_readonly_fields(self, request, obj=None):
+        readonly_fields = super().get_readonly_fields(request, obj)
+        if obj is None:
+            return readonly_fields
+        return (*readonly_fields, *self.counted_fields)
 
 
 @admin.register(Tags)
@@ -54,9 +73,10 @@ class RecipesAuthorFilters(AutocompleteFilter):
 
 
 @admin.register(Recipes)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(CountedRelationAdmin):
     """Класс настройки раздела рецепты."""
 
+    counted_fields = ('author',)
     list_display = (
         'id',
         'name',
@@ -64,7 +84,9 @@ class RecipeAdmin(admin.ModelAdmin):
         'cooking_time',
         'author',
         'image',
-        'pub_date'
+        'pub_date',
+        'favorites_count',
+        'in_carts_count',
     )
     list_display_links = ('id', 'name',)
     empty_value_display = 'значение отсутствует'
@@ -72,6 +94,11 @@ class RecipeAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     inlines = (IngredientsInLine, )
 
+    def save_related(self, request, form, formsets, change):
+        with sync_shopping_lists((form.instance.id,)):
+            super().save_related(request, form, formsets, change)
+        update_search_vectors([form.instance.id])
+
 
 @admin.register(IngredientsRecipes)
 class IngredientRecipeAdmin(admin.ModelAdmin):
@@ -88,11 +115,30 @@ class IngredientRecipeAdmin(admin.ModelAdmin):
     list_filter = ('recipes',)
     search_fields = ('recipes__name',)
 
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipes_id}
+        if change:
+            recipe_ids.update(IngredientsRecipes.objects.filter(
+                pk=obj.pk
+            ).values_list('recipes_id', flat=True))
+        with sync_shopping_lists(recipe_ids):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with sync_shopping_lists((obj.recipes_id,)):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = queryset.values_list('recipes_id', flat=True)
+        with sync_shopping_lists(recipe_ids):
+            super().delete_queryset(request, queryset)
+
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(CountedRelationAdmin):
     """Класс настройки раздела избранные."""
 
+    counted_fields = ('user', 'recipes')
     list_display = (
         'id',
         'user',
@@ -104,9 +150,10 @@ class FavoriteAdmin(admin.ModelAdmin):
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(CountedRelationAdmin):
     """Класс настройки раздела корзина."""
 
+    counted_fields = ('author', 'recipes')
     list_display = (
         'id',
         'author',
@@ -115,3 +162,18 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     search_fields = ('author__username',)
     list_display_links = ('id', 'author',)
     list_filter = [RecipesAuthorFilters]
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    """Класс настройки раздела сводных списков покупок."""
+
+    list_display = (
+        'id',
+        'user',
+        'ingredient',
+        'amount',
+    )
+    list_display_links = ('id', 'user',)
+    search_fields = ('user__username',)
+    readonly_fields = ('user', 'ingredient', 'amount')
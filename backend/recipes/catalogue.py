@@ -0,0 +1,99 @@
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from foodgram.metrics import cache_result
+from recipes.constants import CATALOGUE_CACHE_TIMEOUT
+from recipes.models import Ingredients, Tags
+
+
+@dataclass(frozen=True)
+class CatalogueEntry:
+    """Снимок справочника."""
+
+    data: list
+    etag: str
+    last_modified: int
+    by_id: dict = field(repr=False)
+
+
+class CatalogueCache:
+    """Версионируемый кэш справочника в памяти процесса.
+
+    Номер версии хранится в кэше Django, поэтому при общем бэкенде
+    (memcached, redis, БД) сброс виден всем воркерам. Сам снимок
+    хранится локально и дублируется в кэше Django, чтобы новый воркер
+    не обращался к базе. Версия меняется только после коммита, иначе
+    параллельный запрос собрал бы под новой версией снимок из старых
+    строк. С кэшем в памяти процесса при нескольких воркерах
+    (RESPONSE_CACHE_ENABLED выключен) сброс другим воркерам не виден,
+    поэтому снимок не используется вовсе.
+    """
+
+    def __init__(self, name, queryset, fields):
+        self.name = name
+        self.queryset = queryset
+        self.fields = fields
+        self.version_key = f'catalogue:{name}:version'
+        self.metric_name = f'catalogue_{name}'
+        self._local = None
+
+    def _entry_key(self, version):
+        return f'catalogue:{self.name}:{version}'
+
+    def _build(self, version):
+        data = list(self.queryset.order_by('id').values(*self.fields))
+        content = json.dumps(data, ensure_ascii=False, sort_keys=True)
+        return CatalogueEntry(
+            data=data,
+            etag=hashlib.md5(content.encode()).hexdigest(),
+            last_modified=version // 1_000_000_000,
+            by_id={item['id']: item for item in data},
+        )
+
+    def get(self):
+        """Актуальный снимок справочника или None без общего кэша."""
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return None
+        version = cache.get(self.version_key)
+        if version is None:
+            version = self._new_version()
+        if self._local is not None and self._local[0] == version:
+            cache_result(self.metric_name, hits=1)
+            return self._local[1]
+
+        entry = cache.get(self._entry_key(version))
+        if entry is None:
+            cache_result(self.metric_name, hits=0, misses=1)
+            entry = self._build(version)
+            cache.set(
+                self._entry_key(version), entry, CATALOGUE_CACHE_TIMEOUT
+            )
+        else:
+            cache_result(self.metric_name, hits=1)
+        self._local = (version, entry)
+        return entry
+
+    def _new_version(self):
+        version = time.time_ns()
+        cache.set(self.version_key, version, CATALOGUE_CACHE_TIMEOUT)
+        self._local = None
+        return version
+
+    def invalidate(self):
+        """Сброс справочника с присвоением новой версии после коммита."""
+        transaction.on_commit(self._new_version)
+
+
+tags_catalogue = CatalogueCache(
+    'tags', Tags.objects.all(), ('id', 'name', 'slug')
+)
+ingredients_catalogue = CatalogueCache(
+    'ingredients', Ingredients.objects.all(),
+    ('id', 'name', 'measurement_unit')
+)
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    """Предупреждение о кэшах ответов, выключенных из-за бэкенда."""
+    if settings.RESPONSE_CACHE_ENABLED:
+        return []
+    return [Warning(
+        'Кэши ответов и справочников выключены: кэш в памяти процесса '
+        'не общий для нескольких воркеров.',
+        hint='Укажите общий CACHE_BACKEND (например, RedisCache) или '
+             'запустите один воркер (GUNICORN_WORKERS=1).',
+        id='recipes.W001',
+    )]
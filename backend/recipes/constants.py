@@ -12,3 +12,25 @@ PAGE_SIZE = 10
 MAX_PAGE_SIZE = 100
 MAX_TIME = 360
 MIN_TIME = 1
+SHOPPING_LIST_CHUNK_SIZE = 500
+SHOPPING_LIST_FORMAT_PARAM = 'file_format'
+PDF_FONT_NAME = 'DejaVuSans'
+PDF_FONT_SIZE = 12
+PDF_LINE_HEIGHT = 18
+PDF_MARGIN = 50
+INGREDIENTS_SEARCH_LIMIT = 50
+INGREDIENTS_TRIGRAM_MIN_LENGTH = 3
+CATALOGUE_CACHE_TIMEOUT = 60 * 60
+SEARCH_CONFIG = 'russian'
+RECIPE_CACHE_TIMEOUT = 60 * 10
+IMAGE_VARIANT_WIDTHS = (320, 640)
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_UPLOAD_MAX_SIZE = 5 * 1024 * 1024
+IMAGE_UPLOAD_MAX_PIXELS = 4096 * 4096
+BASE64_CHUNK_SIZE = 64 * 1024
+SHORT_LINK_ALPHABET = ('0123456789abcdefghijklmnopqrstuvwxyz'
+                       'ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+SHORT_LINK_MAX_LENGTH = 11
+SHORT_LINK_CACHE_SIZE = 10_000
+MAX_ID = 2 ** 63 - 1
+BULK_MAX_ITEMS = 100
@@ -0,0 +1,69 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favorite, Recipes, ShoppingCart
+from users.models import Subscription, User
+
+
+def count_subquery(queryset, field):
+    """Подзапрос с количеством связанных строк."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+COUNTERS = (
+    (Recipes, 'favorites_count', Favorite.objects.all(), 'recipes'),
+    (Recipes, 'in_carts_count', ShoppingCart.objects.all(), 'recipes'),
+    (User, 'recipes_count', Recipes.objects.all(), 'author'),
+    (User, 'subscribers_count', Subscription.objects.all(), 'author'),
+)
+
+
+def change_counter(model, counter, ids, delta):
+    """Изменение счётчика на delta без ухода ниже нуля.
+
+    Счётчик может отстать от данных (строки, созданные в обход
+    приложения), поэтому уменьшение ограничено нулём, а не падает на
+    ограничении CHECK >= 0. Точное значение восстанавливает
+    reconcile_counters.
+    """
+    value = F(counter) + delta
+    if delta < 0:
+        value = Greatest(value, 0)
+    return model.objects.filter(pk__in=ids).update(**{counter: value})
+
+
+def count_relation(instance, delta, origin=None):
+    """Учёт созданной или удалённой строки связи в счётчиках.
+
+    Удаление, начатое с самого владельца счётчика (каскад при удалении
+    рецепта или пользователя), счётчик не трогает.
+    """
+    for model, counter, related, field in COUNTERS:
+        if not isinstance(instance, related.model):
+            continue
+        owner_id = getattr(instance, f'{field}_id')
+        if isinstance(origin, model) and origin.pk == owner_id:
+            continue
+        change_counter(model, counter, [owner_id], delta)
+
+
+def reconcile_counters():
+    """Исправляет расхождения счётчиков с фактическими данными.
+
+    Возвращает словарь {счётчик: количество исправленных строк}.
+    """
+    fixed = {}
+    for model, counter, related, field in COUNTERS:
+        actual = count_subquery(related, field)
+        fixed[f'{model.__name__}.{counter}'] = model.objects.annotate(
+            actual=actual
+        ).exclude(**{counter: F('actual')}).update(**{counter: actual})
+    return fixed
@@ -1,10 +1,91 @@
-def shopping_list_file(ingredients):
-    """Функция создания файла.txt"""
-    lines = []
+import csv
+import os
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipes.constants import (
+    PDF_FONT_NAME,
+    PDF_FONT_SIZE,
+    PDF_LINE_HEIGHT,
+    PDF_MARGIN,
+)
+
+
+class Echo:
+    """Псевдобуфер, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def _rows(ingredients):
     for ingredient in ingredients:
-        name = ingredient['ingredient__name']
-        measurement_unit = ingredient['ingredient__measurement_unit']
-        amount = ingredient['total_amount']
-        lines.append(f'{name} ({measurement_unit}) - {amount}')
-    content = '\n'.join(lines)
-    return content
+        yield (
+            ingredient['ingredient__name'],
+            ingredient['ingredient__measurement_unit'],
+            ingredient['total_amount'],
+        )
+
+
+def shopping_list_txt(ingredients):
+    """Построчная генерация файла.txt"""
+    for name, measurement_unit, amount in _rows(ingredients):
+        yield f'{name} ({measurement_unit}) - {amount}\n'
+
+
+def shopping_list_csv(ingredients):
+    """Построчная генерация файла.csv"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    for row in _rows(ingredients):
+        yield writer.writerow(row)
+
+
+def _pdf_font():
+    """Регистрация шрифта с поддержкой кириллицы."""
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    if not os.path.exists(settings.SHOPPING_LIST_PDF_FONT):
+        return 'Helvetica'
+    pdfmetrics.registerFont(
+        TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_PDF_FONT)
+    )
+    return PDF_FONT_NAME
+
+
+def shopping_list_pdf(ingredients):
+    """Генерация файла.pdf
+
+    Документ собирается целиком, так как PDF содержит таблицу ссылок в
+    конце файла; объём ограничен числом различных ингредиентов.
+    """
+    buffer = BytesIO()
+    document = canvas.Canvas(buffer, pagesize=A4)
+    font = _pdf_font()
+    _, height = A4
+    top = height - PDF_MARGIN
+    document.setFont(font, PDF_FONT_SIZE)
+    position = top
+    for name, measurement_unit, amount in _rows(ingredients):
+        if position < PDF_MARGIN:
+            document.showPage()
+            document.setFont(font, PDF_FONT_SIZE)
+            position = top
+        document.drawString(
+            PDF_MARGIN, position, f'{name} ({measurement_unit}) - {amount}'
+        )
+        position -= PDF_LINE_HEIGHT
+    document.save()
+    yield buffer.getvalue()
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': ('text/plain; charset=utf-8', shopping_list_txt),
+    'csv': ('text/csv; charset=utf-8', shopping_list_csv),
+    'pdf': ('application/pdf', shopping_list_pdf),
+}
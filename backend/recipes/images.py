@@ -0,0 +1,104 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image
+
+from recipes.constants import IMAGE_VARIANT_QUALITY, IMAGE_VARIANT_WIDTHS
+
+logger = logging.getLogger(__name__)
+
+# Потоки обрабатывают изображения в самом веб-воркере, и задачи из их
+# очереди теряются при перезапуске. С IMAGE_PROCESSING_WORKERS=0 потоки
+# не создаются, а копии строит отдельный процесс
+# build_image_variants --watch, он же дособирает потерянные задачи.
+executor = None
+if settings.IMAGE_PROCESSING_WORKERS > 0:
+    executor = ThreadPoolExecutor(
+        max_workers=settings.IMAGE_PROCESSING_WORKERS,
+        thread_name_prefix='image-variants',
+    )
+
+
+def variant_name(name, width):
+    """Путь уменьшенной WebP-копии изображения заданной ширины."""
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'variants', f'{stem}_{width}.webp')
+
+
+def render_variant(image, width):
+    """WebP-копия изображения шириной не больше width."""
+    variant = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    variant.thumbnail((width, variant.height), Image.LANCZOS)
+    buffer = BytesIO()
+    variant.save(buffer, 'WEBP', quality=IMAGE_VARIANT_QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def build_variants(model, pk, field_name, variants_field):
+    """Создание копий всех размеров и сохранение ссылок на них."""
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    name = getattr(instance, field_name).name
+    if not name:
+        return
+
+    variants = {}
+    with default_storage.open(name) as file, Image.open(file) as image:
+        image.load()
+        for width in IMAGE_VARIANT_WIDTHS:
+            target = variant_name(name, width)
+            default_storage.delete(target)
+            variants[str(width)] = default_storage.save(
+                target, render_variant(image, width)
+            )
+
+    instance.refresh_from_db(fields=[field_name])
+    if getattr(instance, field_name).name == name:
+        setattr(instance, variants_field, variants)
+        instance.save(update_fields=[variants_field])
+
+
+def _run(model, pk, field_name, variants_field):
+    try:
+        build_variants(model, pk, field_name, variants_field)
+    except Exception:
+        logger.exception(
+            'Не удалось обработать изображение %s pk=%s',
+            model.__name__, pk
+        )
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(instance, field_name, variants_field):
+    """Постановка изображения в очередь на обработку после коммита.
+
+    Копии, построенные не для текущего файла, сразу очищаются: пустые
+    ссылки отмечают изображение как ожидающее обработки, и его находит
+    build_image_variants, даже если задача в потоке потерялась. Задача
+    в потоке ставится, только если потоки включены.
+    """
+    name = getattr(instance, field_name).name
+    variants = getattr(instance, variants_field)
+    width = IMAGE_VARIANT_WIDTHS[0]
+    if name and variants.get(str(width)) == variant_name(name, width):
+        return
+    if variants:
+        type(instance).objects.filter(pk=instance.pk).update(
+            **{variants_field: {}}
+        )
+    if not name or executor is None:
+        return
+
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: executor.submit(
+        _run, model, pk, field_name, variants_field
+    ))
@@ -0,0 +1,98 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from recipes.images import build_variants
+from recipes.models import Recipes
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+IMAGES = (
+    (Recipes, 'image', 'image_variants'),
+    (User, 'avatar', 'avatar_variants'),
+)
+
+
+class Command(BaseCommand):
+    """Подготовка уменьшенных копий изображений."""
+
+    help = ('Создаёт WebP-копии фотографий рецептов и аватаров, для '
+            'которых их ещё нет. С --all пересоздаёт все копии, с --watch '
+            'работает отдельным процессом обработки изображений.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать копии для всех изображений.'
+        )
+        parser.add_argument(
+            '--watch', action='store_true',
+            help='Не завершаться: проверять новые изображения каждые '
+                 '--interval секунд.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между проверками в режиме --watch, в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['watch']:
+            self.build(options['all'])
+            self.stdout.write(
+                self.style.SUCCESS('Копии изображений готовы.')
+            )
+            return
+
+        failed = set()
+        while True:
+            close_old_connections()
+            try:
+                self.build(options['all'], failed, verbose=False)
+            except DatabaseError:
+                logger.exception('Не удалось получить изображения из базы')
+            else:
+                options['all'] = False
+            time.sleep(options['interval'])
+
+    def build(self, rebuild_all, failed=None, verbose=True):
+        """Обработка изображений без копий (или всех), кроме failed.
+
+        failed - файлы, которые не удалось обработать: в режиме --watch
+        они не повторяются на каждой проверке, а новый файл того же
+        объекта обрабатывается. Ошибка одного изображения не прерывает
+        обработку остальных. Ошибки базы (например, после перезапуска
+        PostgreSQL или PgBouncer) файл в failed не добавляют: он будет
+        обработан на следующей проверке с новым соединением.
+        """
+        failed = set() if failed is None else failed
+        for model, field_name, variants_field in IMAGES:
+            queryset = model.objects.exclude(
+                **{field_name: ''}
+            ).exclude(**{f'{field_name}__isnull': True})
+            if not rebuild_all:
+                queryset = queryset.filter(**{variants_field: {}})
+            images = [
+                image for image in queryset.values_list('pk', field_name)
+                if (model, *image) not in failed
+            ]
+            errors = 0
+            for pk, name in images:
+                try:
+                    build_variants(model, pk, field_name, variants_field)
+                except Exception as error:
+                    errors += 1
+                    if not isinstance(error, DatabaseError):
+                        failed.add((model, pk, name))
+                    logger.exception(
+                        'Не удалось обработать изображение %s pk=%s',
+                        model.__name__, pk
+                    )
+                    close_old_connections()
+            if verbose or images:
+                self.stdout.write(
+                    f'{model._meta.verbose_name_plural}: обработано '
+                    f'{len(images) - errors}, ошибок {errors}'
+                )
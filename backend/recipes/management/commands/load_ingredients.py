@@ -0,0 +1,194 @@
+import csv
+import json
+import re
+import time
+from io import StringIO
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.catalogue import ingredients_catalogue
+from recipes.models import Ingredients
+
+INGREDIENTS_CONSTRAINT = 'unique_ingredient'
+JSON_CHUNK_SIZE = 64 * 1024
+WHITESPACE = re.compile(r'\s*')
+
+
+def read_csv(file):
+    """Строки CSV-файла вида name,measurement_unit."""
+    for row in csv.reader(file):
+        if len(row) != 2:
+            raise CommandError(f'Некорректная строка: {row}')
+        yield row
+
+
+def iter_json_array(file, chunk_size=JSON_CHUNK_SIZE):
+    """Элементы JSON-массива по одному, без чтения файла целиком.
+
+    В памяти держится только прочитанный кусок файла и недочитанный
+    элемент, поэтому размер файла не ограничен памятью процесса.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        chunk = file.read(chunk_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            position = WHITESPACE.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise CommandError('Ожидается JSON-массив.')
+                started = True
+                position += 1
+            elif buffer[position] == ']':
+                return
+            elif buffer[position] == ',':
+                position += 1
+            else:
+                try:
+                    item, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if chunk:
+                        break
+                    raise CommandError('Некорректный JSON.')
+                yield item
+        if not chunk:
+            raise CommandError('Некорректный JSON: массив не закрыт.')
+
+
+def read_json(file):
+    """Записи JSON: список объектов или фикстура Django."""
+    for item in iter_json_array(file):
+        fields = item.get('fields', item)
+        yield fields['name'], fields['measurement_unit']
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
+
+class CsvRowsFile:
+    """Файловый объект для COPY, строки CSV формируются по мере чтения.
+
+    copy_expert читает файл кусками через read(size), поэтому в памяти
+    одновременно находится не больше одного куска, а не весь файл.
+    """
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.total = 0
+        self._line = StringIO()
+        self._writer = csv.writer(self._line)
+        self._pending = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._pending) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self._writer.writerow(row)
+            self._pending += self._line.getvalue()
+            self._line.seek(0)
+            self._line.truncate()
+            self.total += 1
+        if size < 0:
+            size = len(self._pending)
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+
+class Command(BaseCommand):
+    """Загрузка справочника ингредиентов."""
+
+    help = ('Загружает ингредиенты из CSV или JSON пачками, пропуская '
+            'уже существующие. Повторный запуск ничего не дублирует.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='+',
+            help='Файлы .csv (name,measurement_unit) или .json.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1_000)
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Загрузка через COPY (только PostgreSQL).'
+        )
+
+    def handle(self, *args, **options):
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy поддерживается только в PostgreSQL.')
+
+        before = Ingredients.objects.count()
+        started = time.perf_counter()
+        total = 0
+        for path in map(Path, options['paths']):
+            reader = READERS.get(path.suffix.lower())
+            if reader is None:
+                raise CommandError(f'Неизвестный формат файла: {path}')
+            try:
+                with open(path, encoding='utf-8') as file:
+                    rows = reader(file)
+                    if options['copy']:
+                        total += self.copy_rows(rows)
+                    else:
+                        total += self.insert_rows(rows, options['batch_size'])
+            except FileNotFoundError:
+                raise CommandError(f'Файл {path} не найден.')
+
+        elapsed = time.perf_counter() - started
+        created = Ingredients.objects.count() - before
+        if created:
+            ingredients_catalogue.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {total}, добавлено: {created}, '
+            f'{total / elapsed if elapsed else total:.0f} строк/с.'
+        ))
+
+    @staticmethod
+    def insert_rows(rows, batch_size):
+        """Пакетная вставка через bulk_create."""
+        total = 0
+        with transaction.atomic():
+            while batch := list(islice(rows, batch_size)):
+                Ingredients.objects.bulk_create(
+                    (
+                        Ingredients(name=name, measurement_unit=unit)
+                        for name, unit in batch
+                    ),
+                    ignore_conflicts=True,
+                )
+                total += len(batch)
+        return total
+
+    @staticmethod
+    def copy_rows(rows):
+        """Потоковая вставка через COPY во временную таблицу."""
+        file = CsvRowsFile(rows)
+        table = connection.ops.quote_name(Ingredients._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE ingredients_import '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                'COPY ingredients_import FROM STDIN WITH (FORMAT csv)', file
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredients_import '
+                f'ON CONFLICT ON CONSTRAINT {INGREDIENTS_CONSTRAINT} '
+                'DO NOTHING'
+            )
+            cursor.execute('DROP TABLE ingredients_import')
+        return file.total
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import ShoppingListItem
+from recipes.shopping_list import live_shopping_lists, rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    """Пересборка и проверка сводных списков покупок."""
+
+    help = ('Сверяет сводные списки покупок с корзинами пользователей '
+            'и пересобирает их.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только проверить расхождения, без пересборки.'
+        )
+        parser.add_argument(
+            '--users', nargs='*', type=int,
+            help='id пользователей, по умолчанию - все.'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['users'] or None
+        if options['verify']:
+            mismatches = self.count_mismatches(user_ids)
+            if mismatches:
+                raise CommandError(
+                    f'Расхождений со списками покупок: {mismatches}'
+                )
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+
+        rebuild_shopping_lists(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересобраны, строк: '
+            f'{ShoppingListItem.objects.count()}'
+        ))
+
+    @staticmethod
+    def count_mismatches(user_ids=None):
+        """Количество строк, отличающихся от пересчёта по корзинам."""
+        live = live_shopping_lists(user_ids).values_list(
+            'author_id',
+            'recipes__ingredientsrecipes__ingredient_id',
+            'total_amount',
+        )
+        stored = ShoppingListItem.objects.all()
+        if user_ids is not None:
+            stored = stored.filter(user_id__in=user_ids)
+        stored = stored.values_list('user_id', 'ingredient_id', 'amount')
+        return (
+            live.difference(stored).count()
+            + stored.difference(live).count()
+        )
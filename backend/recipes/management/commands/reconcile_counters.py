@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    """Сверка денормализованных счётчиков."""
+
+    help = ('Пересчитывает счётчики избранного, корзин, рецептов и '
+            'подписчиков и исправляет расхождения.')
+
+    def handle(self, *args, **options):
+        for counter, fixed in reconcile_counters().items():
+            self.stdout.write(f'{counter}: исправлено строк {fixed}')
+        self.stdout.write(self.style.SUCCESS('Счётчики сверены.'))
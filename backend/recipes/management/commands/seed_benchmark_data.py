@@ -0,0 +1,210 @@
+import random
+from itertools import islice
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import (
+    Favorite,
+    Ingredients,
+    IngredientsRecipes,
+    Recipes,
+    ShoppingCart,
+    Tags,
+)
+from recipes.counters import reconcile_counters
+from recipes.search import update_search_vectors
+from recipes.shopping_list import rebuild_shopping_lists
+from users.models import Subscription, User
+
+BENCH_PREFIX = 'bench_'
+BENCH_TAGS = (
+    ('Завтрак', 'breakfast'),
+    ('Обед', 'lunch'),
+    ('Ужин', 'dinner'),
+    ('Десерт', 'dessert'),
+    ('Выпечка', 'bakery'),
+)
+DEFAULT_INGREDIENTS_FILE = (
+    settings.BASE_DIR.parent / 'data' / 'ingredients.csv'
+)
+
+
+def batched(iterable, size):
+    """Разбивает итерируемый объект на списки длиной size."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    """Наполнение базы синтетическими данными для бенчмарков."""
+
+    help = ('Создаёт синтетических пользователей, рецепты, избранное, '
+            'корзины и подписки для нагрузочного тестирования API.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument(
+            '--relations', type=int, default=1_000_000,
+            help='Количество строк избранного и корзины (суммарно).'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='Количество подписок на одного пользователя.'
+        )
+        parser.add_argument(
+            '--ingredients-file', default=str(DEFAULT_INGREDIENTS_FILE),
+            help='Справочник ингредиентов для load_ingredients.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить ранее созданные синтетические данные и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+
+        if options['clear']:
+            deleted, _ = User.objects.filter(
+                username__startswith=BENCH_PREFIX
+            ).delete()
+            self.stdout.write(f'Удалено объектов: {deleted}')
+            return
+
+        if User.objects.filter(username__startswith=BENCH_PREFIX).exists():
+            raise CommandError(
+                'Синтетические данные уже созданы, '
+                'используйте --clear для их удаления.'
+            )
+
+        with transaction.atomic():
+            self._seed_ingredients(options['ingredients_file'])
+            tag_ids = self._seed_tags()
+            user_ids = self._seed_users(options['users'])
+            recipe_ids = self._seed_recipes(
+                user_ids, tag_ids, options['recipes']
+            )
+            self._seed_relations(user_ids, recipe_ids, options['relations'])
+            self._seed_subscriptions(user_ids, options['subscriptions'])
+            rebuild_shopping_lists(batch_size=self.batch_size)
+            reconcile_counters()
+            update_search_vectors()
+
+        self.stdout.write(self.style.SUCCESS('Синтетические данные созданы.'))
+
+    def _bulk_create(self, model, objects, **kwargs):
+        created = []
+        for batch in batched(objects, self.batch_size):
+            created.extend(
+                model.objects.bulk_create(batch, **kwargs)
+            )
+        return created
+
+    def _seed_ingredients(self, path):
+        call_command(
+            'load_ingredients', path,
+            batch_size=self.batch_size, stdout=self.stdout
+        )
+        self.stdout.write(f'Ингредиентов: {Ingredients.objects.count()}')
+
+    def _seed_tags(self):
+        for name, slug in BENCH_TAGS:
+            Tags.objects.get_or_create(slug=slug, defaults={'name': name})
+        return list(Tags.objects.values_list('id', flat=True))
+
+    def _seed_users(self, count):
+        users = (
+            User(
+                username=f'{BENCH_PREFIX}{index}',
+                email=f'{BENCH_PREFIX}{index}@example.com',
+                first_name='Пользователь',
+                last_name=str(index),
+                password='!',
+            )
+            for index in range(count)
+        )
+        user_ids = [user.id for user in self._bulk_create(User, users)]
+        self.stdout.write(f'Пользователей: {len(user_ids)}')
+        return user_ids
+
+    def _seed_recipes(self, user_ids, tag_ids, count):
+        ingredient_ids = list(Ingredients.objects.values_list('id', flat=True))
+        recipes = (
+            Recipes(
+                author_id=self.random.choice(user_ids),
+                name=f'Рецепт {index}',
+                text='Синтетический рецепт для нагрузочного тестирования.',
+                cooking_time=self.random.randint(1, 120),
+                image='recipes/benchmark.png',
+            )
+            for index in range(count)
+        )
+        recipe_ids = [recipe.id for recipe in self._bulk_create(
+            Recipes, recipes
+        )]
+
+        recipe_tags = (
+            Recipes.tags.through(recipes_id=recipe_id, tags_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.random.sample(
+                tag_ids, self.random.randint(1, min(3, len(tag_ids)))
+            )
+        )
+        self._bulk_create(Recipes.tags.through, recipe_tags)
+
+        ingredients = (
+            IngredientsRecipes(
+                recipes_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=self.random.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in self.random.sample(
+                ingredient_ids, self.random.randint(3, 12)
+            )
+        )
+        self._bulk_create(IngredientsRecipes, ingredients)
+        self.stdout.write(f'Рецептов: {len(recipe_ids)}')
+        return recipe_ids
+
+    def _seed_relations(self, user_ids, recipe_ids, count):
+        favorites = (
+            Favorite(
+                user_id=self.random.choice(user_ids),
+                recipes_id=self.random.choice(recipe_ids),
+            )
+            for _ in range(count // 2)
+        )
+        self._bulk_create(Favorite, favorites, ignore_conflicts=True)
+
+        cart = (
+            ShoppingCart(
+                author_id=self.random.choice(user_ids),
+                recipes_id=self.random.choice(recipe_ids),
+            )
+            for _ in range(count - count // 2)
+        )
+        self._bulk_create(ShoppingCart, cart, ignore_conflicts=True)
+        self.stdout.write(
+            f'Избранное: {Favorite.objects.count()}, '
+            f'корзины: {ShoppingCart.objects.count()}'
+        )
+
+    def _seed_subscriptions(self, user_ids, per_user):
+        subscriptions = (
+            Subscription(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in self.random.sample(
+                user_ids, min(per_user, len(user_ids))
+            )
+            if author_id != user_id
+        )
+        self._bulk_create(Subscription, subscriptions, ignore_conflicts=True)
+        self.stdout.write(f'Подписок: {Subscription.objects.count()}')
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.16 on 2026-10-18 05:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+
+def fill_shopping_lists(apps, schema_editor):
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    rows = ShoppingCart.objects.values(
+        'author_id', 'recipes__ingredientsrecipes__ingredient_id'
+    ).annotate(
+        total_amount=Sum('recipes__ingredientsrecipes__amount')
+    ).filter(total_amount__gt=0)
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=row['author_id'],
+                ingredient_id=row['recipes__ingredientsrecipes__ingredient_id'],
+                amount=row['total_amount'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to='recipes.ingredients', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Ингредиенты в списках покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_item'),
+        ),
+        migrations.RunPython(
+            fill_shopping_lists, migrations.RunPython.noop
+        ),
+    ]
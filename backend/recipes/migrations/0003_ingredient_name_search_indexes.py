@@ -0,0 +1,25 @@
+# Generated by Django 4.2.16 on 2026-10-18 05:26
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_shoppinglistitem'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='ingredients',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='ingredient_name_prefix'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredients',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='ingredient_name_trgm'),
+        ),
+    ]
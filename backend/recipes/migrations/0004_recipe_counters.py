@@ -0,0 +1,55 @@
+# Generated by Django 4.2.16 on 2026-10-18 05:28
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipes = apps.get_model('recipes', 'Recipes')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    User = apps.get_model('users', 'User')
+    Subscription = apps.get_model('users', 'Subscription')
+    Recipes.objects.update(
+        favorites_count=count_subquery(Favorite, 'recipes'),
+        in_carts_count=count_subquery(ShoppingCart, 'recipes'),
+    )
+    User.objects.update(
+        recipes_count=count_subquery(Recipes, 'author'),
+        subscribers_count=count_subquery(Subscription, 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_ingredient_name_search_indexes'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В корзинах'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
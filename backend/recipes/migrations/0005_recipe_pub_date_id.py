@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 05:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date_id'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.16 on 2026-10-18 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_pub_date_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['recipes', 'user'], name='favorite_recipe_user'),
+        ),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='recipe_author_pub_date_id'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['recipes', 'author'], name='shopping_list_recipe_user'),
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX recipe_tags_tag_recipe '
+            'ON recipes_recipes_tags (tags_id, recipes_id);',
+            'DROP INDEX recipe_tags_tag_recipe;',
+        ),
+    ]
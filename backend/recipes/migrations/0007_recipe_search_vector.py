@@ -0,0 +1,48 @@
+# Generated by Django 4.2.16 on 2026-10-18 05:39
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, TextField
+
+SEARCH_CONFIG = 'russian'
+
+
+def fill_search_vector(apps, schema_editor):
+    Recipes = apps.get_model('recipes', 'Recipes')
+    IngredientsRecipes = apps.get_model('recipes', 'IngredientsRecipes')
+    ingredient_names = Subquery(
+        IngredientsRecipes.objects.filter(
+            recipes=OuterRef('pk')
+        ).order_by().values('recipes').annotate(
+            names=StringAgg('ingredient__name', delimiter=' ')
+        ).values('names'),
+        output_field=TextField(),
+    )
+    Recipes.objects.update(search_vector=(
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(ingredient_names, weight='C', config=SEARCH_CONFIG)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 05:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='image_variants',
+            field=models.JSONField(default=dict, editable=False, verbose_name='Уменьшенные копии'),
+        ),
+    ]
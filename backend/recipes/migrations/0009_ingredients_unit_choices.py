@@ -0,0 +1,27 @@
+# Generated by Django 4.2.16 on 2026-10-18 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredients',
+            options={'verbose_name': 'Ингредиент', 'verbose_name_plural': 'Ингредиенты'},
+        ),
+        migrations.AlterField(
+            model_name='ingredients',
+            name='measurement_unit',
+            field=models.CharField(choices=[('kg', 'кг'), ('g', 'г'), ('ml', 'мл')], max_length=64, verbose_name='Вес'),
+        ),
+        migrations.AlterField(
+            model_name='recipes',
+            name='ingredients',
+            field=models.ManyToManyField(related_name='recipes', through='recipes.IngredientsRecipes', to='recipes.ingredients', verbose_name='Ингредиенты'),
+        ),
+    ]
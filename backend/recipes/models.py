@@ -1,5 +1,8 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 
 from recipes.constants import (
@@ -63,6 +66,16 @@ class Ingredients(models.Model):
                 name='unique_ingredient',
             ),
         )
+        indexes = (
+            models.Index(
+                OpClass(Upper('name'), name='text_pattern_ops'),
+                name='ingredient_name_prefix',
+            ),
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='ingredient_name_trgm',
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -87,6 +100,11 @@ class Recipes(models.Model):
         default=None,
         verbose_name='Фотография',
     )
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии',
+        default=dict,
+        editable=False,
+    )
     text = models.TextField(
         verbose_name='Текст'
     )
@@ -118,10 +136,35 @@ class Recipes(models.Model):
         verbose_name='Дата публикации рецепта',
         auto_now_add=True,
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В корзинах',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'), name='recipe_pub_date_id'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_author_pub_date_id',
+            ),
+            GinIndex(fields=('search_vector',), name='recipe_search_vector'),
+        )
 
     def __str__(self):
         return self.name
@@ -182,6 +225,11 @@ class ShoppingCart(models.Model):
                 fields=('author', 'recipes'), name='shopping_list_recipe'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('recipes', 'author'), name='shopping_list_recipe_user'
+            ),
+        )
 
     def __str__(self):
         return f'Корзина покупок {self.author.username}'
@@ -210,6 +258,44 @@ class Favorite(models.Model):
                 fields=('user', 'recipes'), name='unique_favorite_recipe'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('recipes', 'user'), name='favorite_recipe_user'
+            ),
+        )
 
     def __str__(self):
         return f'Рецепт {self.recipes} в избранном у пользователя {self.user}'
+
+
+class ShoppingListItem(models.Model):
+    """Сводное количество ингредиента в списке покупок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredients,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент',
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество',
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.ingredient} - {self.amount} у {self.user}'
@@ -0,0 +1,183 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from foodgram.metrics import cache_result
+from recipes.constants import RECIPE_CACHE_TIMEOUT
+
+LIST_GENERATION_KEY = 'recipes:list:generation'
+SEARCH_GENERATION_KEY = 'recipes:search:generation'
+
+
+def recipe_version_key(recipe_id):
+    return f'recipe:{recipe_id}:version'
+
+
+def recipe_versions(recipe_ids):
+    """Текущие версии рецептов, недостающие создаются заново.
+
+    Версия, вытесненная из кэша, получает новое значение, поэтому
+    записи, собранные до вытеснения, перестают ей соответствовать.
+    """
+    keys = {recipe_version_key(recipe_id): recipe_id
+            for recipe_id in recipe_ids}
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def generation_keys(search):
+    if search:
+        return (LIST_GENERATION_KEY, SEARCH_GENERATION_KEY)
+    return (LIST_GENERATION_KEY,)
+
+
+def list_generation(search=False):
+    """Поколение списков: меняется, когда меняется состав выдачи.
+
+    Для поисковой выдачи в поколение входит ещё и поколение поиска: её
+    состав зависит от названия, текста и ингредиентов рецептов.
+    """
+    keys = generation_keys(search)
+    generations = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, None)
+        generations.update(missing)
+    return [generations[key] for key in keys]
+
+
+def invalidate_recipes(recipe_ids, lists=True, search=None):
+    """Сброс закэшированных ответов для рецептов после коммита.
+
+    Новые версии рецептов делают недействительными их карточки и
+    страницы списков, на которых они есть. С lists=True сбрасываются
+    все страницы списков: рецепт мог появиться, исчезнуть или сменить
+    позицию в выдаче. С search=True (по умолчанию равен lists)
+    сбрасываются страницы поиска: рецепт мог начать или перестать
+    находиться.
+    """
+    recipe_ids = list(recipe_ids)
+    if search is None:
+        search = lists
+
+    def bump():
+        version = time.time_ns()
+        versions = {
+            recipe_version_key(recipe_id): version
+            for recipe_id in recipe_ids
+        }
+        if lists:
+            versions[LIST_GENERATION_KEY] = version
+        if search:
+            versions[SEARCH_GENERATION_KEY] = version
+        cache.set_many(versions, None)
+
+    transaction.on_commit(bump)
+
+
+def get_recipe(recipe_id, origin):
+    """Карточка рецепта из кэша, если её версия актуальна.
+
+    origin - схема и хост запроса: ссылки на изображения в ответе
+    абсолютные, поэтому для каждого хоста хранится своя карточка.
+    """
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None
+    version_key = recipe_version_key(recipe_id)
+    entry_key = f'recipe:{recipe_id}:detail:{origin}'
+    values = cache.get_many((version_key, entry_key))
+    entry = values.get(entry_key)
+    if entry is None or entry['version'] != values.get(version_key):
+        cache_result('recipe_detail', hits=0, misses=1)
+        return None
+    cache_result('recipe_detail', hits=1)
+    return entry['data']
+
+
+def set_recipe(recipe_id, origin, version, data):
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return
+    cache.set(
+        f'recipe:{recipe_id}:detail:{origin}',
+        {'version': version, 'data': data},
+        RECIPE_CACHE_TIMEOUT,
+    )
+
+
+def get_list_page(key, search=False):
+    """Страница списка из кэша, если не изменились она и её рецепты."""
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None
+    keys = generation_keys(search)
+    values = cache.get_many((*keys, key))
+    entry = values.get(key)
+    if entry is None or entry['generation'] != [
+        values.get(generation_key) for generation_key in keys
+    ] or recipe_versions(entry['versions']) != entry['versions']:
+        cache_result('recipe_list', hits=0, misses=1)
+        return None
+    cache_result('recipe_list', hits=1)
+    return entry['data']
+
+
+def set_list_page(key, generation, versions, data):
+    """Сохранение страницы списка.
+
+    generation читается до запроса страницы, versions - до её
+    сериализации: изменение, закоммиченное позже, не должно считаться
+    учтённым в сохранённых данных.
+    """
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return
+    cache.set(
+        key,
+        {'generation': generation, 'versions': versions, 'data': data},
+        RECIPE_CACHE_TIMEOUT,
+    )
+
+
+def recipe_fragment_key(recipe_id, origin):
+    return f'recipe:{recipe_id}:fragment:{origin}'
+
+
+def get_fragments(versions, origin):
+    """Общие для всех пользователей представления рецептов из кэша.
+
+    versions — словарь {id рецепта: актуальная версия}, возвращаются
+    только фрагменты с совпадающей версией. Как и карточки, фрагменты
+    хранятся отдельно для каждого origin.
+    """
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return {}
+    entries = cache.get_many(
+        [recipe_fragment_key(recipe_id, origin) for recipe_id in versions]
+    )
+    fragments = {}
+    for recipe_id, version in versions.items():
+        entry = entries.get(recipe_fragment_key(recipe_id, origin))
+        if entry is not None and entry['version'] == version:
+            fragments[recipe_id] = entry['data']
+    cache_result(
+        'recipe_fragment', len(fragments), len(versions) - len(fragments)
+    )
+    return fragments
+
+
+def set_fragments(versions, fragments, origin):
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return
+    cache.set_many(
+        {
+            recipe_fragment_key(recipe_id, origin): {
+                'version': versions[recipe_id], 'data': data,
+            }
+            for recipe_id, data in fragments.items()
+        },
+        RECIPE_CACHE_TIMEOUT,
+    )
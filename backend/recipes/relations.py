@@ -0,0 +1,48 @@
+from django.db import connection
+
+
+def _columns(model, owner_field, target_field):
+    quote = connection.ops.quote_name
+    meta = model._meta
+    return (
+        quote(meta.db_table),
+        quote(meta.get_field(owner_field).column),
+        quote(meta.get_field(target_field).column),
+    )
+
+
+def insert_relations(model, owner_field, owner_id, target_field,
+                     target_ids):
+    """Создание связей через INSERT ... ON CONFLICT DO NOTHING.
+
+    Уже существующие связи пропускает уникальное ограничение, поэтому
+    повторный или одновременный запрос не приводит к IntegrityError.
+    Возвращает id целей, для которых строка действительно вставлена.
+    """
+    if not target_ids:
+        return set()
+    table, owner, target = _columns(model, owner_field, target_field)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({owner}, {target}) '
+            f'SELECT %s, unnest(%s::bigint[]) ORDER BY 2 '
+            f'ON CONFLICT DO NOTHING RETURNING {target}',
+            [owner_id, sorted(target_ids)],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def delete_relations(model, owner_field, owner_id, target_field,
+                     target_ids):
+    """Удаление связей с возвратом id целей удалённых строк."""
+    if not target_ids:
+        return set()
+    table, owner, target = _columns(model, owner_field, target_field)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} '
+            f'WHERE {owner} = %s AND {target} = ANY(%s::bigint[]) '
+            f'RETURNING {target}',
+            [owner_id, sorted(target_ids)],
+        )
+        return {row[0] for row in cursor.fetchall()}
@@ -0,0 +1,31 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db.models import OuterRef, Subquery, TextField
+
+from recipes.constants import SEARCH_CONFIG
+from recipes.models import IngredientsRecipes, Recipes
+
+
+def search_vector():
+    """Поисковый вектор рецепта: название, текст и названия ингредиентов."""
+    ingredient_names = Subquery(
+        IngredientsRecipes.objects.filter(
+            recipes=OuterRef('pk')
+        ).order_by().values('recipes').annotate(
+            names=StringAgg('ingredient__name', delimiter=' ')
+        ).values('names'),
+        output_field=TextField(),
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(ingredient_names, weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(recipe_ids=None):
+    """Пересчёт поискового вектора для рецептов (по умолчанию всех)."""
+    recipes = Recipes.objects.all()
+    if recipe_ids is not None:
+        recipes = recipes.filter(pk__in=recipe_ids)
+    return recipes.update(search_vector=search_vector())
@@ -0,0 +1,180 @@
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from recipes.models import (
+    IngredientsRecipes,
+    Recipes,
+    ShoppingCart,
+    ShoppingListItem,
+)
+from users.models import User
+
+
+def lock_recipes(recipe_ids):
+    """Блокировка строк рецептов до конца транзакции по порядку id.
+
+    Изменение состава рецепта и добавление его в корзину сначала
+    блокируют рецепт, затем пользователей в update_shopping_lists, поэтому
+    одновременные изменения не теряют строки корзин и не блокируют друг
+    друга крест-накрест. FOR NO KEY UPDATE не мешает проверкам внешних
+    ключей.
+    """
+    list(Recipes.objects.select_for_update(no_key=True).filter(
+        pk__in=recipe_ids
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def recipe_ingredients(recipe_id):
+    """Количество каждого ингредиента в рецепте."""
+    return Counter(dict(
+        IngredientsRecipes.objects.filter(
+            recipes_id=recipe_id
+        ).values_list('ingredient_id', 'amount')
+    ))
+
+
+def update_shopping_lists(user_ids, deltas):
+    """Применяет изменения количества ингредиентов к спискам покупок.
+
+    deltas - словарь {id ингредиента: изменение количества}, одинаковый
+    для всех переданных пользователей.
+    """
+    user_ids = sorted(set(user_ids))
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    if not user_ids or not deltas:
+        return
+
+    with transaction.atomic():
+        list(User.objects.select_for_update().filter(
+            pk__in=user_ids
+        ).order_by('pk').values_list('pk', flat=True))
+
+        items = ShoppingListItem.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=deltas
+        )
+        existing = set(items.values_list('user_id', 'ingredient_id'))
+        if existing:
+            items.update(amount=Greatest(
+                F('amount') + Case(
+                    *(When(ingredient_id=ingredient_id, then=Value(delta))
+                      for ingredient_id, delta in deltas.items()),
+                    default=Value(0),
+                ),
+                Value(0),
+            ))
+            items.filter(amount=0).delete()
+
+        ShoppingListItem.objects.bulk_create(
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=delta
+            )
+            for user_id in user_ids
+            for ingredient_id, delta in deltas.items()
+            if delta > 0 and (user_id, ingredient_id) not in existing
+        )
+
+
+def recipes_ingredients(recipe_ids):
+    """Суммарное количество каждого ингредиента в рецептах."""
+    totals = Counter()
+    for ingredient_id, amount in IngredientsRecipes.objects.filter(
+        recipes_id__in=recipe_ids
+    ).values_list('ingredient_id', 'amount'):
+        totals[ingredient_id] += amount
+    return totals
+
+
+def add_recipes_to_shopping_list(user, recipe_ids):
+    """Добавляет ингредиенты рецептов в список покупок."""
+    update_shopping_lists((user.id,), recipes_ingredients(recipe_ids))
+
+
+def remove_recipes_from_shopping_list(user, recipe_ids):
+    """Убирает ингредиенты рецептов из списка покупок."""
+    deltas = recipes_ingredients(recipe_ids)
+    update_shopping_lists(
+        (user.id,),
+        {ingredient_id: -amount for ingredient_id, amount in deltas.items()}
+    )
+
+
+def change_recipe_in_shopping_lists(recipe_id, old, new):
+    """Переносит изменение состава рецепта в списки покупок."""
+    deltas = Counter(new)
+    deltas.subtract(old)
+    update_shopping_lists(
+        ShoppingCart.objects.filter(
+            recipes_id=recipe_id
+        ).values_list('author_id', flat=True),
+        deltas
+    )
+
+
+def remove_recipe_from_shopping_lists(recipe_id):
+    """Убирает удаляемый рецепт из списков покупок всех корзин."""
+    lock_recipes((recipe_id,))
+    change_recipe_in_shopping_lists(
+        recipe_id, recipe_ingredients(recipe_id), {}
+    )
+
+
+@contextmanager
+def sync_shopping_lists(recipe_ids):
+    """Переносит в списки покупок изменения состава рецептов в блоке.
+
+    Для правок через ORM (админка, shell): состав рецептов читается до
+    и после блока, разница применяется к спискам их корзин.
+    """
+    recipe_ids = set(recipe_ids)
+    with transaction.atomic():
+        lock_recipes(recipe_ids)
+        old = {
+            recipe_id: recipe_ingredients(recipe_id)
+            for recipe_id in recipe_ids
+        }
+        yield
+        for recipe_id, ingredients in old.items():
+            change_recipe_in_shopping_lists(
+                recipe_id, ingredients, recipe_ingredients(recipe_id)
+            )
+
+
+def live_shopping_lists(user_ids=None):
+    """Списки покупок, посчитанные по корзинам."""
+    carts = ShoppingCart.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(author_id__in=user_ids)
+    return carts.values(
+        'author_id', 'recipes__ingredientsrecipes__ingredient_id'
+    ).annotate(
+        total_amount=Sum('recipes__ingredientsrecipes__amount')
+    ).filter(total_amount__gt=0)
+
+
+def rebuild_shopping_lists(user_ids=None, batch_size=5_000):
+    """Пересобирает списки покупок по содержимому корзин."""
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    rows = live_shopping_lists(user_ids).iterator(chunk_size=batch_size)
+    with transaction.atomic():
+        items.delete()
+        while batch := list(islice(rows, batch_size)):
+            ShoppingListItem.objects.bulk_create(
+                ShoppingListItem(
+                    user_id=row['author_id'],
+                    ingredient_id=row[
+                        'recipes__ingredientsrecipes__ingredient_id'
+                    ],
+                    amount=row['total_amount'],
+                )
+                for row in batch
+            )
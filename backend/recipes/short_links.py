@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from recipes.constants import (
+    MAX_ID,
+    SHORT_LINK_ALPHABET,
+    SHORT_LINK_CACHE_SIZE,
+    SHORT_LINK_MAX_LENGTH,
+)
+from recipes.models import Recipes
+
+BASE = len(SHORT_LINK_ALPHABET)
+DIGITS = {char: value for value, char in enumerate(SHORT_LINK_ALPHABET)}
+
+
+def encode(recipe_id):
+    """Код base62 для id рецепта."""
+    code = ''
+    while True:
+        recipe_id, digit = divmod(recipe_id, BASE)
+        code = SHORT_LINK_ALPHABET[digit] + code
+        if not recipe_id:
+            return code
+
+
+def decode(code):
+    """Id рецепта по коду или None, если код некорректен."""
+    if not code or len(code) > SHORT_LINK_MAX_LENGTH or (
+        len(code) > 1 and code[0] == SHORT_LINK_ALPHABET[0]
+    ):
+        return None
+    recipe_id = 0
+    for char in code:
+        if char not in DIGITS:
+            return None
+        recipe_id = recipe_id * BASE + DIGITS[char]
+    return recipe_id if recipe_id <= MAX_ID else None
+
+
+def short_link(recipe_id):
+    """Короткая ссылка на рецепт."""
+    return f'{settings.DOMAIN}/s/{encode(recipe_id)}'
+
+
+class KnownRecipes:
+    """LRU id существующих рецептов в памяти процесса.
+
+    Повторные переходы по популярным ссылкам не обращаются к базе.
+    Удалённый рецепт вычёркивается сигналом в том воркере, где его
+    удалили; в остальных ссылка ведёт на страницу рецепта до вытеснения
+    id из LRU, и фронтенд показывает, что рецепт не найден.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def exists(self, recipe_id):
+        with self._lock:
+            if recipe_id in self._ids:
+                self._ids.move_to_end(recipe_id)
+                return True
+        if not Recipes.objects.filter(pk=recipe_id).exists():
+            return False
+        with self._lock:
+            self._ids[recipe_id] = None
+            if len(self._ids) > self.size:
+                self._ids.popitem(last=False)
+        return True
+
+    def forget(self, recipe_id):
+        with self._lock:
+            self._ids.pop(recipe_id, None)
+
+
+known_recipes = KnownRecipes(SHORT_LINK_CACHE_SIZE)
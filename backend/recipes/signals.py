@@ -0,0 +1,203 @@
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from recipes.catalogue import ingredients_catalogue, tags_catalogue
+from recipes.counters import count_relation
+from recipes.images import schedule_variants
+from recipes.models import (
+    Favorite,
+    Ingredients,
+    Recipes,
+    ShoppingCart,
+    Tags,
+)
+from recipes.recipe_cache import invalidate_recipes
+from recipes.search import update_search_vectors
+from recipes.shopping_list import (
+    add_recipes_to_shopping_list,
+    remove_recipe_from_shopping_lists,
+    remove_recipes_from_shopping_list,
+)
+from recipes.short_links import known_recipes
+from users.models import Subscription, User
+
+
+@receiver((post_save, post_delete), sender=Tags)
+def invalidate_tags(**kwargs):
+    """Сброс кэша тегов при изменении."""
+    tags_catalogue.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Ingredients)
+def invalidate_ingredients(**kwargs):
+    """Сброс кэша ингредиентов при изменении."""
+    ingredients_catalogue.invalidate()
+
+
+@receiver(post_save, sender=Ingredients)
+def update_recipes_search(instance, created, **kwargs):
+    """Пересчёт поиска рецептов с переименованным ингредиентом."""
+    if not created:
+        update_search_vectors(
+            Recipes.objects.filter(ingredients=instance).values('id')
+        )
+
+
+def list_position(instance):
+    """Поля рецепта, от которых зависят фильтры и порядок списков.
+
+    Отложенные поля не загружаются: вместо них None, и изменение
+    считается возможным.
+    """
+    return (instance.__dict__.get('author_id'),
+            instance.__dict__.get('pub_date'))
+
+
+@receiver(post_init, sender=Recipes)
+def remember_list_position(instance, **kwargs):
+    instance._list_position = list_position(instance)
+
+
+@receiver(post_save, sender=Recipes)
+def invalidate_recipe_responses(instance, created, **kwargs):
+    """Сброс кэша ответов для изменённого рецепта.
+
+    Все страницы списков сбрасываются, только если рецепт мог
+    появиться в выдаче или сменить в ней позицию: при создании,
+    смене автора или даты публикации. Правка названия, текста или
+    ингредиентов сбрасывает лишь его карточку, страницы с ним и
+    поисковую выдачу.
+    """
+    position = list_position(instance)
+    moved = created or None in position or (
+        position != instance._list_position
+    )
+    instance._list_position = position
+    invalidate_recipes([instance.id], lists=moved, search=True)
+
+
+@receiver(post_delete, sender=Recipes)
+def invalidate_deleted_recipe_responses(instance, **kwargs):
+    """Сброс кэша ответов для удалённого рецепта и списков."""
+    invalidate_recipes([instance.id])
+
+
+@receiver(m2m_changed, sender=Recipes.tags.through)
+def invalidate_retagged_recipe_responses(instance, action, reverse, pk_set,
+                                         **kwargs):
+    """Сброс списков при смене тегов: меняется выдача по фильтру."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_recipes([instance.id])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_recipes(pk_set)
+    elif action == 'pre_clear':
+        invalidate_recipes(instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Recipes)
+def forget_short_link(instance, **kwargs):
+    """Удалённый рецепт больше не открывается по короткой ссылке."""
+    known_recipes.forget(instance.id)
+
+
+def deleted_with(origin, *models):
+    """Удаление начато с объекта или queryset одной из моделей."""
+    if isinstance(origin, QuerySet):
+        return origin.model in models
+    return isinstance(origin, models)
+
+
+@receiver(pre_delete, sender=Recipes)
+def remove_recipe_from_carts(instance, **kwargs):
+    """Удаляемый рецепт уходит из списков покупок всех корзин."""
+    remove_recipe_from_shopping_lists(instance.id)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_cart_to_shopping_list(instance, created, **kwargs):
+    """Рецепт, добавленный в корзину через ORM, попадает в список.
+
+    API добавляет рецепты в корзину SQL-запросом и обновляет списки
+    покупок само, сигналы при этом не отправляются.
+    """
+    if created:
+        add_recipes_to_shopping_list(instance.author, (instance.recipes_id,))
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_cart_from_shopping_list(instance, origin=None, **kwargs):
+    """Рецепт, удалённый из корзины через ORM, уходит из списка.
+
+    При удалении рецепта его ингредиенты убираются из всех списков
+    сразу, а список удаляемого пользователя удаляется каскадом.
+    """
+    if not deleted_with(origin, Recipes, User):
+        remove_recipes_from_shopping_list(
+            instance.author, (instance.recipes_id,)
+        )
+
+
+@receiver((post_save, pre_delete), sender=Tags)
+@receiver((post_save, pre_delete), sender=Ingredients)
+def invalidate_related_recipe_responses(instance, **kwargs):
+    """Сброс кэша ответов для рецептов с изменённым тегом или ингредиентом."""
+    if not kwargs.get('created'):
+        invalidate_recipes(instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipe_responses(instance, created, update_fields,
+                                       **kwargs):
+    """Сброс кэша карточек рецептов автора при изменении профиля."""
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    invalidate_recipes(
+        Recipes.objects.filter(author=instance).values_list('id', flat=True),
+        lists=False,
+    )
+
+
+@receiver(post_save, sender=Recipes)
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+def count_created_relation(instance, created, **kwargs):
+    """Учёт новой строки в счётчиках при любом способе создания."""
+    if created:
+        count_relation(instance, 1)
+
+
+@receiver(post_delete, sender=Recipes)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+def count_deleted_relation(instance, origin=None, **kwargs):
+    """Учёт удалённой строки в счётчиках, в том числе при каскаде."""
+    count_relation(instance, -1, origin)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def invalidate_counted_recipe_response(instance, **kwargs):
+    """Сброс кэша карточки рецепта с изменившимися счётчиками."""
+    invalidate_recipes([instance.recipes_id], lists=False)
+
+
+@receiver(post_save, sender=Recipes)
+def process_recipe_image(instance, **kwargs):
+    """Фоновая подготовка уменьшенных копий фотографии рецепта."""
+    schedule_variants(instance, 'image', 'image_variants')
+
+
+@receiver(post_save, sender=User)
+def process_avatar(instance, **kwargs):
+    """Фоновая подготовка уменьшенных копий аватара."""
+    schedule_variants(instance, 'avatar', 'avatar_variants')
@@ -0,0 +1,117 @@
+import base64
+from io import BytesIO
+
+import pytest
+from django.core.cache import cache
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredients, IngredientsRecipes, Recipes, Tags
+
+
+def image_base64(size=(1, 1), image_format='PNG'):
+    """Изображение в формате data URI, как его присылает фронтенд."""
+    buffer = BytesIO()
+    Image.new('RGB', size, 'white').save(buffer, image_format)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/{image_format.lower()};base64,{encoded}'
+
+
+@pytest.fixture
+def make_image():
+    return image_base64
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def make_user(django_user_model):
+    def make(username):
+        return django_user_model.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password='password',
+            first_name=username,
+            last_name=username,
+        )
+
+    return make
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user('user')
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def token_client(user):
+    """Клиент с токеном: force_authenticate не виден async-представлениям."""
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}'
+    )
+    return client
+
+
+@pytest.fixture
+def tags():
+    return Tags.objects.bulk_create(
+        Tags(name=f'Тег {index}', slug=f'tag_{index}')
+        for index in range(3)
+    )
+
+
+@pytest.fixture
+def ingredients():
+    return Ingredients.objects.bulk_create(
+        Ingredients(name=f'Ингредиент {index}', measurement_unit='g')
+        for index in range(40)
+    )
+
+
+@pytest.fixture
+def make_recipes(tags, ingredients):
+    def make(author, count, ingredients_per_recipe=3):
+        recipes = []
+        for index in range(count):
+            recipe = Recipes.objects.create(
+                author=author,
+                name=f'Рецепт {author.username} {index}',
+                image='recipes/images/recipe.png',
+                text='Описание',
+                cooking_time=10,
+            )
+            recipe.tags.set(tags[:2])
+            IngredientsRecipes.objects.bulk_create(
+                IngredientsRecipes(
+                    recipes=recipe, ingredient=ingredient, amount=10
+                )
+                for ingredient in ingredients[:ingredients_per_recipe]
+            )
+            recipes.append(recipe)
+        return recipes
+
+    return make
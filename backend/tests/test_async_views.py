@@ -0,0 +1,158 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncClient, Client
+from django.urls import include, path
+from rest_framework.authtoken.models import Token
+
+from api.urls import async_urlpatterns, router
+from recipes.models import Favorite, ShoppingCart
+from recipes.search import update_search_vectors
+from users.models import Subscription
+
+
+class SyncUrls:
+    urlpatterns = [path('api/', include(router.urls))]
+
+
+class AsyncUrls:
+    urlpatterns = [path('api/', include(async_urlpatterns + router.urls))]
+
+
+@pytest.fixture
+def fetch(settings):
+    """Ответ синхронного вьюсета или асинхронного представления."""
+    def fetch(urls, url, token=None):
+        settings.ROOT_URLCONF = urls
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        if urls is not AsyncUrls:
+            return Client().get(url, headers=headers)
+
+        async def get():
+            return await AsyncClient().get(url, headers=headers)
+
+        return async_to_sync(get)()
+
+    return fetch
+
+
+@pytest.fixture
+def compare(fetch):
+    """Сравнение ответов SERVER_MODE=asgi и wsgi на один запрос.
+
+    Асинхронное представление проверяется и при сборке ответа, и при
+    отдаче из кэша. DRF добавляет заголовок Allow, поэтому по нему
+    видно, ответило ли асинхронное представление или вьюсет.
+    """
+    def compare(url, token=None, answered_async=True):
+        cache.clear()
+        expected = fetch(SyncUrls, url, token)
+        cache.clear()
+        built = fetch(AsyncUrls, url, token)
+        cached = fetch(AsyncUrls, url, token)
+        for response in (built, cached):
+            assert response.status_code == expected.status_code
+            assert response.json() == expected.json()
+            assert response.get('ETag') == expected.get('ETag')
+            assert ('Allow' not in response) is answered_async
+        return expected.json()
+
+    return compare
+
+
+@pytest.fixture
+def recipes(user, make_user, make_recipes):
+    author = make_user('author')
+    recipes = make_recipes(author, 7)
+    update_search_vectors()
+    Favorite.objects.create(user=user, recipes=recipes[-1])
+    ShoppingCart.objects.create(author=user, recipes=recipes[-2])
+    Subscription.objects.create(user=user, author=author)
+    return recipes
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user).key
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('authenticated', (False, True))
+@pytest.mark.parametrize('query', (
+    '',
+    '?limit=2',
+    '?page=2&limit=2',
+    '?page=last&limit=3',
+    '?tags=tag_0&limit=5',
+    '?search=%D0%A0%D0%B5%D1%86%D0%B5%D0%BF%D1%82&limit=2',
+    '?is_favorited=1',
+    '?is_in_shopping_cart=1',
+))
+def test_recipe_list_matches_viewset(compare, recipes, token, authenticated,
+                                     query):
+    data = compare(
+        f'/api/recipes/{query}', token if authenticated else None
+    )
+    assert data['count']
+
+
+@pytest.mark.django_db
+def test_recipe_list_pages_follow_paginator_links(compare, recipes):
+    data = compare('/api/recipes/?page=2&limit=3')
+    assert data['next'] == 'http://testserver/api/recipes/?limit=3&page=3'
+    assert data['previous'] == 'http://testserver/api/recipes/?limit=3'
+
+
+@pytest.mark.django_db
+def test_author_filter_matches_viewset(compare, recipes):
+    compare(f'/api/recipes/?author={recipes[0].author_id}')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('authenticated', (False, True))
+def test_recipe_detail_matches_viewset(compare, recipes, token,
+                                       authenticated):
+    token = token if authenticated else None
+    compare(f'/api/recipes/{recipes[-1].id}/', token)
+    compare(f'/api/recipes/{recipes[-1].id}/get-link/', token)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', (
+    '/api/ingredients/',
+    '/api/ingredients/?name=%D0%98%D0%BD%D0%B3%D1%80',
+    '/api/ingredients/{ingredient}/',
+    '/api/tags/',
+    '/api/tags/{tag}/',
+))
+def test_catalogue_matches_viewset(compare, tags, ingredients, url):
+    compare(url.format(ingredient=ingredients[0].id, tag=tags[0].id))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', (
+    '/api/recipes/?page=99',
+    '/api/recipes/?page=abc',
+    '/api/recipes/?author=abc',
+    '/api/recipes/?cursor=bad',
+    '/api/recipes/999999/',
+    '/api/recipes/999999/get-link/',
+    '/api/ingredients/999999/',
+))
+def test_errors_are_left_to_viewset(compare, recipes, url):
+    """Ошибки формирует вьюсет, поэтому их формат не меняется."""
+    compare(url, answered_async=False)
+
+
+@pytest.mark.django_db
+def test_invalid_token_is_left_to_viewset(compare, recipes):
+    compare('/api/recipes/', 'invalid', answered_async=False)
+
+
+@pytest.mark.django_db
+def test_catalogue_without_shared_cache_is_left_to_viewset(
+    settings, compare, ingredients
+):
+    settings.RESPONSE_CACHE_ENABLED = False
+    compare('/api/ingredients/?name=%D0%98%D0%BD%D0%B3%D1%80',
+            answered_async=False)
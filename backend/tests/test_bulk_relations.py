@@ -0,0 +1,150 @@
+import pytest
+
+from recipes.constants import BULK_MAX_ITEMS
+from recipes.models import Favorite, Recipes, ShoppingCart
+from recipes.shopping_list import live_shopping_lists
+from tests.test_shopping_list import expected_list, shopping_list
+from users.models import Subscription, User
+
+MISSING_ID = 999999
+
+
+def statuses(response):
+    assert response.status_code == 200, response.data
+    return {item['id']: item['status'] for item in response.data['results']}
+
+
+def counters(recipes, counter):
+    return dict(Recipes.objects.filter(
+        pk__in=[recipe.pk for recipe in recipes]
+    ).values_list('pk', counter))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('action, model, user_field, counter', (
+    ('favorite', Favorite, 'user', 'favorites_count'),
+    ('shopping_cart', ShoppingCart, 'author', 'in_carts_count'),
+))
+def test_bulk_recipe_relations(
+    user, user_client, make_user, make_recipes, action, model, user_field,
+    counter
+):
+    """Дубли, уже добавленные и неизвестные id в пакетном запросе."""
+    first, second, third = make_recipes(make_user('author'), 3)
+    model.objects.create(**{user_field: user}, recipes=first)
+    url = f'/api/recipes/{action}/'
+    ids = [first.id, second.id, second.id, MISSING_ID, third.id]
+
+    response = user_client.post(url, {'ids': ids}, format='json')
+    assert [item['id'] for item in response.data['results']] == [
+        first.id, second.id, MISSING_ID, third.id
+    ]
+    assert statuses(response) == {
+        first.id: 'already_added',
+        second.id: 'created',
+        MISSING_ID: 'not_found',
+        third.id: 'created',
+    }
+    assert counters((first, second, third), counter) == {
+        first.id: 1, second.id: 1, third.id: 1,
+    }
+    assert model.objects.filter(**{user_field: user}).count() == 3
+
+    response = user_client.delete(
+        url, {'ids': [second.id, second.id, MISSING_ID]}, format='json'
+    )
+    assert statuses(response) == {
+        second.id: 'deleted', MISSING_ID: 'not_found',
+    }
+    response = user_client.delete(url, {'ids': [second.id]}, format='json')
+    assert statuses(response) == {second.id: 'not_in_list'}
+    assert counters((first, second, third), counter) == {
+        first.id: 1, second.id: 0, third.id: 1,
+    }
+
+
+@pytest.mark.django_db
+def test_bulk_shopping_cart_keeps_shopping_list(
+    user, user_client, make_user, make_recipes, ingredients
+):
+    """Сводный список покупок совпадает с корзиной после пакетов."""
+    author = make_user('author')
+    recipes = make_recipes(author, 2) + make_recipes(
+        author, 2, ingredients_per_recipe=5
+    )
+    url = '/api/recipes/shopping_cart/'
+    ids = [recipe.id for recipe in recipes]
+
+    user_client.post(url, {'ids': ids + ids[:2]}, format='json')
+    assert shopping_list(user) == expected_list(user)
+    assert shopping_list(user)[ingredients[0].id] == 40
+
+    user_client.delete(url, {'ids': ids[1:3]}, format='json')
+    assert shopping_list(user) == expected_list(user)
+    assert shopping_list(user)[ingredients[4].id] == 10
+
+    user_client.delete(url, {'ids': ids}, format='json')
+    assert shopping_list(user) == {}
+    assert not list(live_shopping_lists((user.id,)))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', (
+    '/api/recipes/favorite/',
+    '/api/recipes/shopping_cart/',
+    '/api/users/subscribe/',
+))
+@pytest.mark.parametrize('ids, valid', (
+    (list(range(1, BULK_MAX_ITEMS + 1)), True),
+    (list(range(1, BULK_MAX_ITEMS + 2)), False),
+    ([], False),
+    ([0], False),
+    (['abc'], False),
+))
+def test_bulk_ids_are_validated(user_client, url, ids, valid):
+    response = user_client.post(url, {'ids': ids}, format='json')
+    assert response.status_code == (200 if valid else 400)
+    if not valid:
+        assert 'ids' in response.data
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', (
+    '/api/recipes/favorite/',
+    '/api/recipes/shopping_cart/',
+    '/api/users/subscribe/',
+))
+def test_bulk_requires_authentication(client, url):
+    assert client.post(url, {'ids': [1]}, format='json').status_code == 401
+
+
+@pytest.mark.django_db
+def test_bulk_subscribe(user, user_client, make_user):
+    """Подписка на себя отклоняется, счётчики меняются по факту."""
+    first, second = make_user('first'), make_user('second')
+    Subscription.objects.create(user=user, author=first)
+    url = '/api/users/subscribe/'
+    ids = [user.id, first.id, second.id, second.id, MISSING_ID]
+
+    response = user_client.post(url, {'ids': ids}, format='json')
+    assert statuses(response) == {
+        user.id: 'self',
+        first.id: 'already_subscribed',
+        second.id: 'created',
+        MISSING_ID: 'not_found',
+    }
+    assert not Subscription.objects.filter(user=user, author=user).exists()
+    assert dict(User.objects.filter(
+        pk__in=(user.id, first.id, second.id)
+    ).values_list('pk', 'subscribers_count')) == {
+        user.id: 0, first.id: 1, second.id: 1,
+    }
+
+    response = user_client.delete(
+        url, {'ids': [user.id, first.id, first.id]}, format='json'
+    )
+    assert statuses(response) == {user.id: 'self', first.id: 'deleted'}
+    response = user_client.delete(url, {'ids': [first.id]}, format='json')
+    assert statuses(response) == {first.id: 'not_subscribed'}
+    assert User.objects.get(pk=first.id).subscribers_count == 0
+    assert Subscription.objects.filter(user=user).count() == 1
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+from django.db import connection, transaction
+
+from recipes.catalogue import tags_catalogue
+from recipes.models import Ingredients, Tags
+
+TAGS_URL = '/api/tags/'
+INGREDIENTS_URL = '/api/ingredients/'
+
+
+def tag_names(client):
+    response = client.get(TAGS_URL)
+    assert response.status_code == 200
+    return [tag['name'] for tag in response.json()]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('enabled', (True, False))
+def test_catalogue_follows_changes(settings, client, tags, enabled,
+                                   django_capture_on_commit_callbacks):
+    """Изменения справочника видны сразу, в том числе без общего кэша."""
+    settings.RESPONSE_CACHE_ENABLED = enabled
+    assert tag_names(client) == [tag.name for tag in tags]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        tags[0].name = 'Завтрак'
+        tags[0].save()
+    assert tag_names(client)[0] == 'Завтрак'
+
+
+@pytest.mark.django_db
+def test_catalogue_without_shared_cache_reads_database(
+    settings, client, tags
+):
+    """Без общего кэша снимок не переживает запрос даже без сигналов."""
+    settings.RESPONSE_CACHE_ENABLED = False
+    tag_names(client)
+    Tags.objects.filter(pk=tags[0].pk).update(name='Обед')
+    assert tag_names(client)[0] == 'Обед'
+
+
+@pytest.mark.django_db
+def test_catalogue_without_shared_cache_skips_snapshot(
+    settings, client, ingredients, django_assert_num_queries
+):
+    """Без общего кэша поиск и карточка идут одним запросом без ETag."""
+    settings.RESPONSE_CACHE_ENABLED = False
+    with django_assert_num_queries(1) as context:
+        response = client.get(INGREDIENTS_URL, {'name': 'Ингредиент 1'})
+    assert response.status_code == 200
+    assert 'ORDER BY "recipes_ingredients"."id"' not in (
+        context.captured_queries[0]['sql']
+    )
+    assert 'ETag' not in response
+
+    with django_assert_num_queries(1):
+        response = client.get(f'{INGREDIENTS_URL}{ingredients[0].id}/')
+    assert response.json()['name'] == ingredients[0].name
+    assert 'ETag' not in response
+
+
+@pytest.mark.django_db
+def test_catalogue_with_shared_cache_answers_not_modified(
+    settings, client, ingredients, django_assert_num_queries
+):
+    settings.RESPONSE_CACHE_ENABLED = True
+    etag = client.get(INGREDIENTS_URL)['ETag']
+    with django_assert_num_queries(0):
+        response = client.get(INGREDIENTS_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert Ingredients.objects.count() == len(ingredients)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reader_before_commit_does_not_pin_stale_catalogue(settings, client):
+    """Снимок, собранный до коммита, не выдаётся после него."""
+    settings.RESPONSE_CACHE_ENABLED = True
+    tag = Tags.objects.create(name='Тег', slug='tag')
+    tag_names(client)
+
+    def read():
+        try:
+            tags_catalogue.get()
+        finally:
+            connection.close()
+
+    with transaction.atomic():
+        tag.name = 'Ужин'
+        tag.save()
+        reader = threading.Thread(target=read)
+        reader.start()
+        reader.join()
+
+    assert tag_names(client) == ['Ужин']
@@ -0,0 +1,102 @@
+import threading
+from collections import Counter
+
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Ingredients,
+    IngredientsRecipes,
+    Recipes,
+    ShoppingListItem,
+)
+from users.models import User
+
+THREADS = 8
+
+
+class ConcurrentRelationsTest(TransactionTestCase):
+    """Одновременные запросы одного пользователя к одной связи."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='user', email='user@example.com', password='password'
+        )
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            password='password',
+        )
+        self.recipe = Recipes.objects.create(
+            author=self.author,
+            name='Рецепт',
+            image='',
+            text='Описание',
+            cooking_time=10,
+        )
+        ingredient = Ingredients.objects.create(
+            name='Мука', measurement_unit='g'
+        )
+        IngredientsRecipes.objects.create(
+            recipes=self.recipe, ingredient=ingredient, amount=100
+        )
+
+    def send_concurrently(self, method, url):
+        """Статусы ответов на запросы, отправленные разом из потоков."""
+        barrier = threading.Barrier(THREADS)
+        statuses = []
+        errors = []
+
+        def send():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                statuses.append(getattr(client, method)(url).status_code)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=send) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return Counter(statuses)
+
+    def check_relation(self, url, counter):
+        statuses = self.send_concurrently('post', url)
+        self.assertEqual(statuses, {201: 1, 400: THREADS - 1})
+        self.assertEqual(counter(), 1)
+
+        statuses = self.send_concurrently('delete', url)
+        self.assertEqual(statuses, {204: 1, 400: THREADS - 1})
+        self.assertEqual(counter(), 0)
+
+    def test_favorite(self):
+        self.check_relation(
+            f'/api/recipes/{self.recipe.id}/favorite/',
+            lambda: Recipes.objects.get(pk=self.recipe.pk).favorites_count,
+        )
+        self.assertFalse(self.user.favorite.exists())
+
+    def test_shopping_cart(self):
+        def in_carts():
+            amounts = list(ShoppingListItem.objects.filter(
+                user=self.user
+            ).values_list('amount', flat=True))
+            count = Recipes.objects.get(pk=self.recipe.pk).in_carts_count
+            self.assertEqual(amounts, [100] * count)
+            return count
+
+        self.check_relation(
+            f'/api/recipes/{self.recipe.id}/shopping_cart/', in_carts
+        )
+
+    def test_subscribe(self):
+        self.check_relation(
+            f'/api/users/{self.author.id}/subscribe/',
+            lambda: User.objects.get(pk=self.author.pk).subscribers_count,
+        )
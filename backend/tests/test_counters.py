@@ -0,0 +1,87 @@
+import pytest
+
+from recipes.models import Favorite, Recipes, ShoppingCart
+from users.models import Subscription, User
+
+
+def refresh(instance):
+    instance.refresh_from_db()
+    return instance
+
+
+@pytest.mark.django_db
+def test_orm_writes_update_counters(user, make_user, make_recipes):
+    """Строки из админки и shell учитываются в счётчиках."""
+    author = make_user('author')
+    recipe, = make_recipes(author, 1)
+    Favorite.objects.create(user=user, recipes=recipe)
+    ShoppingCart.objects.create(author=user, recipes=recipe)
+    Subscription.objects.create(user=user, author=author)
+
+    recipe = refresh(recipe)
+    author = refresh(author)
+    assert (recipe.favorites_count, recipe.in_carts_count) == (1, 1)
+    assert (author.recipes_count, author.subscribers_count) == (1, 1)
+
+    user.delete()
+    recipe = refresh(recipe)
+    assert (recipe.favorites_count, recipe.in_carts_count) == (0, 0)
+    assert refresh(author).subscribers_count == 0
+
+    recipe.delete()
+    assert refresh(author).recipes_count == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('action, model, user_field, counter', (
+    ('favorite', Favorite, 'user', 'favorites_count'),
+    ('shopping_cart', ShoppingCart, 'author', 'in_carts_count'),
+))
+def test_drifted_counter_does_not_go_below_zero(
+    user, user_client, make_user, make_recipes, action, model, user_field,
+    counter,
+):
+    recipe, = make_recipes(make_user('author'), 1)
+    model.objects.create(**{user_field: user, 'recipes': recipe})
+    Recipes.objects.filter(pk=recipe.pk).update(**{counter: 0})
+
+    response = user_client.delete(f'/api/recipes/{recipe.id}/{action}/')
+
+    assert response.status_code == 204
+    assert getattr(refresh(recipe), counter) == 0
+
+
+@pytest.mark.django_db
+def test_drifted_subscribers_count_does_not_go_below_zero(
+    user, user_client, make_user
+):
+    author = make_user('author')
+    Subscription.objects.create(user=user, author=author)
+    User.objects.filter(pk=author.pk).update(subscribers_count=0)
+
+    response = user_client.delete(f'/api/users/{author.id}/subscribe/')
+
+    assert response.status_code == 204
+    assert refresh(author).subscribers_count == 0
+
+
+@pytest.mark.django_db
+def test_recipe_exposes_counters(
+    client, user_client, make_user, make_recipes,
+    django_capture_on_commit_callbacks,
+):
+    """Счётчики в ответах не отстают от закэшированных карточек."""
+    recipe, = make_recipes(make_user('author'), 1)
+    for api_client in (client, user_client):
+        api_client.get(f'/api/recipes/{recipe.id}/')
+        api_client.get('/api/recipes/')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.post(f'/api/recipes/{recipe.id}/favorite/')
+        user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+
+    for api_client in (client, user_client):
+        data = api_client.get(f'/api/recipes/{recipe.id}/').json()
+        assert (data['favorites_count'], data['in_carts_count']) == (1, 1)
+        data = api_client.get('/api/recipes/').json()['results'][0]
+        assert (data['favorites_count'], data['in_carts_count']) == (1, 1)
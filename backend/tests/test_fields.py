@@ -0,0 +1,97 @@
+import base64
+import tracemalloc
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api import fields
+from api.fields import StreamingBase64ImageField
+from recipes.constants import IMAGE_UPLOAD_MAX_SIZE
+
+
+def encode(content, image_format='png'):
+    encoded = base64.b64encode(content).decode()
+    return f'data:image/{image_format};base64,{encoded}'
+
+
+def noise_png(width, height):
+    """PNG из случайных пикселей: почти не сжимается."""
+    buffer = BytesIO()
+    image = Image.effect_noise((width, height), 100).convert('RGB')
+    image.save(buffer, 'PNG', compress_level=0)
+    return buffer.getvalue()
+
+
+def test_large_image_is_decoded_in_chunks(make_image):
+    """Пик памяти при декодировании много меньше размера изображения."""
+    content = noise_png(1000, 1000)
+    assert len(content) > 2 * 1024 * 1024
+    data = encode(content)
+    field = StreamingBase64ImageField()
+    # первый вызов загружает модули Pillow, в замер они не входят
+    field.to_internal_value(make_image())
+
+    tracemalloc.start()
+    try:
+        upload = field.to_internal_value(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert upload.size == len(content)
+    assert upload.name.endswith('.png')
+    assert peak < len(content) // 4
+
+
+def test_image_over_size_limit_is_rejected():
+    data = 'data:image/png;base64,' + 'A' * (
+        IMAGE_UPLOAD_MAX_SIZE * 4 // 3 + 8
+    )
+    with pytest.raises(ValidationError, match='Размер изображения'):
+        StreamingBase64ImageField().to_internal_value(data)
+
+
+def test_image_over_pixel_limit_is_rejected(make_image):
+    with pytest.raises(ValidationError, match='пикселей'):
+        StreamingBase64ImageField().to_internal_value(
+            make_image((4097, 4097))
+        )
+
+
+@pytest.mark.parametrize(
+    'data', ('data:image/png;base64,@@@@', 'не изображение', 42)
+)
+def test_not_base64_is_rejected(data):
+    with pytest.raises(ValidationError):
+        StreamingBase64ImageField().to_internal_value(data)
+
+
+def test_disallowed_format_is_rejected(make_image):
+    field = StreamingBase64ImageField()
+    with pytest.raises(ValidationError) as error:
+        field.to_internal_value(make_image(image_format='TIFF'))
+    assert error.value.detail == [field.INVALID_TYPE_MESSAGE]
+
+
+@pytest.mark.parametrize('chunk_size', (10, 64 * 1024))
+@pytest.mark.parametrize('separator', ('\n', '\r\n', ' '))
+def test_wrapped_base64_is_accepted(monkeypatch, chunk_size, separator):
+    """base64 с переносами строк декодируется при любых границах кусков."""
+    monkeypatch.setattr(fields, 'BASE64_CHUNK_SIZE', chunk_size)
+    content = noise_png(40, 30)
+    encoded = base64.encodebytes(content).decode()
+    data = 'data:image/png;base64,' + encoded.replace('\n', separator)
+
+    upload = StreamingBase64ImageField().to_internal_value(data)
+
+    assert upload.size == len(content)
+    upload.seek(0)
+    assert upload.read() == content
+
+
+def test_truncated_base64_is_rejected():
+    data = encode(noise_png(40, 30))[:-1]
+    with pytest.raises(ValidationError):
+        StreamingBase64ImageField().to_internal_value(data)
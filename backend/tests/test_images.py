@@ -0,0 +1,112 @@
+import base64
+import time
+from io import StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import OperationalError
+from PIL import Image
+
+from recipes import images
+from recipes.management.commands import build_image_variants
+from recipes.models import Recipes
+
+
+@pytest.fixture
+def without_threads(monkeypatch):
+    monkeypatch.setattr(images, 'executor', None)
+
+
+def stop_after_first_pass(interval):
+    raise KeyboardInterrupt
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('watch', (False, True))
+def test_changed_image_waits_for_worker(
+    without_threads, monkeypatch, make_image, make_user, make_recipes, watch
+):
+    """Без потоков новое изображение помечается и строится командой."""
+    recipe, = make_recipes(make_user('author'), 1)
+    content = base64.b64decode(make_image((800, 600)).split(',')[1])
+    Recipes.objects.filter(pk=recipe.pk).update(
+        image_variants={'320': 'recipes/images/variants/old_320.webp'}
+    )
+    recipe.refresh_from_db()
+
+    recipe.image.save('new.png', ContentFile(content))
+    recipe.refresh_from_db()
+    assert recipe.image_variants == {}
+
+    if watch:
+        # соединение теста живёт внутри транзакции, его не закрываем
+        monkeypatch.setattr(
+            build_image_variants, 'close_old_connections', lambda: None
+        )
+        monkeypatch.setattr(time, 'sleep', stop_after_first_pass)
+        with pytest.raises(KeyboardInterrupt):
+            call_command(
+                'build_image_variants', '--watch', stdout=StringIO()
+            )
+    else:
+        call_command('build_image_variants', stdout=StringIO())
+
+    recipe.refresh_from_db()
+    assert recipe.image_variants == {
+        str(width): images.variant_name(recipe.image.name, width)
+        for width in (320, 640)
+    }
+
+
+@pytest.mark.django_db
+def test_failed_image_does_not_stop_worker(
+    without_threads, monkeypatch, make_image, make_user, make_recipes
+):
+    """Ошибка одного изображения не останавливает процесс обработки.
+
+    Испорченный файл больше не повторяется, а изображение, на котором
+    пропало соединение с базой, обрабатывается на следующей проверке.
+    """
+    recipes = make_recipes(make_user('author'), 3)
+    content = base64.b64decode(make_image((400, 300)).split(',')[1])
+    for recipe in recipes:
+        recipe.image.save('recipe.png', ContentFile(content))
+    errors = {
+        recipes[0].pk: Image.DecompressionBombError('слишком большое'),
+        recipes[1].pk: OperationalError('server closed the connection'),
+    }
+    calls = []
+    build_variants = build_image_variants.build_variants
+
+    def flaky_build_variants(model, pk, *args):
+        calls.append(pk)
+        if pk in errors:
+            raise errors.pop(pk)
+        build_variants(model, pk, *args)
+
+    closed = []
+    passes = []
+
+    def sleep(interval):
+        passes.append(interval)
+        if len(passes) == 2:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(
+        build_image_variants, 'build_variants', flaky_build_variants
+    )
+    monkeypatch.setattr(
+        build_image_variants, 'close_old_connections',
+        lambda: closed.append(True),
+    )
+    monkeypatch.setattr(time, 'sleep', sleep)
+    with pytest.raises(KeyboardInterrupt):
+        call_command('build_image_variants', '--watch', stdout=StringIO())
+
+    variants = dict(Recipes.objects.values_list('pk', 'image_variants'))
+    assert variants[recipes[0].pk] == {}
+    assert variants[recipes[1].pk] and variants[recipes[2].pk]
+    assert calls.count(recipes[0].pk) == 1
+    assert calls.count(recipes[1].pk) == 2
+    assert len(closed) == 4
@@ -0,0 +1,66 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from recipes.management.commands.load_ingredients import (
+    CsvRowsFile,
+    iter_json_array,
+)
+from recipes.models import Ingredients
+
+ROWS = [(f'ингредиент, "{index}"', 'g') for index in range(50)]
+
+
+@pytest.mark.parametrize('chunk_size', (1, 7, 4096))
+def test_json_array_is_read_in_chunks(chunk_size):
+    items = [{'name': name, 'measurement_unit': unit} for name, unit in ROWS]
+    data = json.dumps(items, ensure_ascii=False, indent=1)
+    assert list(iter_json_array(StringIO(data), chunk_size)) == items
+
+
+@pytest.mark.parametrize('data', ('', '{}', '[{"name": 1}', '[{"name"]'))
+def test_malformed_json_is_rejected(data):
+    with pytest.raises(CommandError):
+        list(iter_json_array(StringIO(data), 4))
+
+
+def test_csv_rows_file_reads_rows_lazily():
+    rows = iter(ROWS)
+    file = CsvRowsFile(rows)
+    first = file.read(64)
+    assert len(first) == 64
+    assert file.total < 5
+    data = first + ''.join(iter(lambda: file.read(64), ''))
+    assert file.total == len(ROWS)
+    assert data == ''.join(
+        f'"{name.replace(chr(34), chr(34) * 2)}",{unit}\r\n'
+        for name, unit in ROWS
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('suffix', ('csv', 'json'))
+@pytest.mark.parametrize('copy', (False, True))
+def test_load_ingredients(tmp_path, suffix, copy):
+    path = tmp_path / f'ingredients.{suffix}'
+    if suffix == 'json':
+        path.write_text(json.dumps([
+            {'name': name, 'measurement_unit': unit} for name, unit in ROWS
+        ]), encoding='utf-8')
+    else:
+        path.write_text(
+            ''.join(f'"{name.replace(chr(34), chr(34) * 2)}",{unit}\n'
+                    for name, unit in ROWS),
+            encoding='utf-8',
+        )
+    args = [str(path), '--copy'] if copy else [str(path)]
+
+    call_command('load_ingredients', *args, stdout=StringIO())
+    call_command('load_ingredients', *args, stdout=StringIO())
+
+    assert sorted(Ingredients.objects.values_list(
+        'name', 'measurement_unit'
+    )) == sorted(ROWS)
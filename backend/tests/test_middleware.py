@@ -0,0 +1,162 @@
+import json
+import logging
+import re
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY
+from rest_framework.test import APIClient
+
+from api.middleware import MetricsMiddleware, RequestProfilingMiddleware
+from api.views import metrics
+from recipes.models import Tags
+
+SERVER_TIMING = re.compile(
+    r'^app;dur=\d+\.\d, db;dur=\d+\.\d;desc="(\d+) queries"$'
+)
+
+
+def repeat_queries(request, count=3):
+    """Вьюха с N+1: одинаковые запросы в цикле."""
+    for pk in range(count):
+        Tags.objects.filter(pk=pk).first()
+    return HttpResponse('ok')
+
+
+async def repeat_queries_async(request):
+    return await sync_to_async(repeat_queries)(request)
+
+
+@pytest.fixture
+def profiling(settings):
+    settings.REQUEST_PROFILING_SAMPLE_RATE = 1
+    settings.REQUEST_PROFILING_DUPLICATES = 3
+    return settings
+
+
+def requests_total(view, action, status=200):
+    return REGISTRY.get_sample_value('foodgram_http_requests_total', {
+        'method': 'GET', 'view': view, 'action': action,
+        'status': str(status),
+    }) or 0
+
+
+@pytest.mark.parametrize('middleware, setting, value', (
+    (RequestProfilingMiddleware, 'REQUEST_PROFILING_SAMPLE_RATE', 0),
+    (MetricsMiddleware, 'METRICS_ENABLED', False),
+))
+def test_disabled_middleware_is_not_used(settings, middleware, setting,
+                                         value):
+    setattr(settings, setting, value)
+    with pytest.raises(MiddlewareNotUsed):
+        middleware(repeat_queries)
+
+
+@pytest.mark.parametrize('get_response', (repeat_queries,
+                                          repeat_queries_async))
+def test_middleware_follows_chain_mode(settings, profiling, get_response):
+    """В асинхронной цепочке middleware не требует sync_to_async."""
+    settings.METRICS_ENABLED = True
+    for middleware in (RequestProfilingMiddleware, MetricsMiddleware):
+        assert middleware.sync_capable and middleware.async_capable
+        assert iscoroutinefunction(middleware(get_response)) is (
+            get_response is repeat_queries_async
+        )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('get_response', (repeat_queries,
+                                          repeat_queries_async))
+def test_profiling_reports_queries_and_duplicates(
+    profiling, rf, caplog, get_response
+):
+    middleware = RequestProfilingMiddleware(get_response)
+    request = rf.get('/api/tags/')
+
+    with caplog.at_level(logging.INFO, logger='api.middleware'):
+        if iscoroutinefunction(middleware):
+            response = async_to_sync(middleware)(request)
+        else:
+            response = middleware(request)
+
+    assert SERVER_TIMING.match(response['Server-Timing']).group(1) == '3'
+    record, = caplog.records
+    assert record.levelno == logging.WARNING
+    profile = json.loads(record.getMessage())
+    assert profile['path'] == '/api/tags/'
+    assert profile['status'] == 200
+    assert profile['queries'] == 3
+    assert profile['response_bytes'] == 2
+    assert [item['count'] for item in profile['duplicates']] == [3]
+
+
+@pytest.mark.django_db
+def test_profiling_through_client(profiling, caplog, tags):
+    with caplog.at_level(logging.INFO, logger='api.middleware'):
+        response = APIClient().get('/api/tags/')
+
+    assert SERVER_TIMING.match(response['Server-Timing'])
+    profile = json.loads(caplog.records[-1].getMessage())
+    assert profile['view'] == 'tags-list'
+    assert profile['duplicates'] == []
+    assert caplog.records[-1].levelno == logging.INFO
+
+
+@pytest.mark.django_db(transaction=True)
+def test_profiling_counts_queries_of_asgi_request(profiling, async_client,
+                                                  tags):
+    """Запросы из потоков sync_to_async попадают в профиль."""
+    cache.clear()
+
+    async def get():
+        return await async_client.get('/api/recipes/')
+
+    response = async_to_sync(get)()
+
+    assert response.status_code == 200
+    queries = SERVER_TIMING.match(response['Server-Timing']).group(1)
+    assert int(queries) > 0
+
+
+@pytest.mark.django_db
+def test_metrics_middleware_counts_requests(settings, tags):
+    settings.METRICS_ENABLED = True
+    before = requests_total('tags-list', 'list')
+    unmatched = requests_total('unmatched', '', 404)
+
+    APIClient().get('/api/tags/')
+    APIClient().get('/missing/')
+
+    assert requests_total('tags-list', 'list') == before + 1
+    assert requests_total('unmatched', '', 404) == unmatched + 1
+    assert REGISTRY.get_sample_value(
+        'foodgram_http_request_db_queries_count',
+        {'view': 'tags-list', 'action': 'list'},
+    )
+
+
+@pytest.mark.django_db
+def test_metrics_view_renders_prometheus_format(settings, rf, tags):
+    settings.METRICS_ENABLED = True
+    APIClient().get('/api/tags/')
+
+    response = metrics(rf.get('/metrics'))
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == CONTENT_TYPE_LATEST
+    body = response.content.decode()
+    for line in (
+        '# TYPE foodgram_http_requests_total counter',
+        '# TYPE foodgram_http_request_duration_seconds histogram',
+        '# TYPE foodgram_db_connections gauge',
+        '# TYPE foodgram_db_pool_utilisation gauge',
+    ):
+        assert line in body
+    assert re.search(
+        r'^foodgram_http_requests_total\{action="list",method="GET",'
+        r'status="200",view="tags-list"\} \d+\.\d+$',
+        body, re.MULTILINE,
+    )
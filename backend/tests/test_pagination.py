@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from recipes.models import Recipes
+
+RECIPES_URL = '/api/recipes/?cursor=&limit=4'
+
+
+def walk(client, url, link):
+    """id рецептов на всех страницах при переходах по ссылке link."""
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert 'count' not in response.json()
+        pages.append([recipe['id'] for recipe in response.json()['results']])
+        url = response.json()[link]
+    return pages
+
+
+@pytest.mark.django_db
+def test_cursor_pages_keep_ties_in_order(client, make_user, make_recipes):
+    """Рецепты с одинаковой датой не теряются и не повторяются."""
+    recipes = make_recipes(make_user('author'), 10)
+    now = timezone.now()
+    dates = [now] * 6 + [now - timedelta(days=1)] * 4
+    for recipe, date in zip(recipes, dates):
+        Recipes.objects.filter(pk=recipe.pk).update(pub_date=date)
+    expected = list(Recipes.objects.order_by(
+        '-pub_date', '-id'
+    ).values_list('id', flat=True))
+
+    pages = walk(client, RECIPES_URL, 'next')
+    assert [recipe_id for page in pages for recipe_id in page] == expected
+    assert [len(page) for page in pages] == [4, 4, 2]
+
+    last = client.get(RECIPES_URL).json()['next']
+    last = client.get(last).json()['next']
+    back = walk(client, client.get(last).json()['previous'], 'previous')
+    assert back == pages[-2::-1]
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_is_not_found(client):
+    response = client.get('/api/recipes/?cursor=cD1bMV0%3D')
+    assert response.status_code == 404
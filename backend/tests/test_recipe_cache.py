@@ -0,0 +1,110 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.views import RecipesViewSet
+from recipes.models import Recipes
+from recipes.recipe_cache import invalidate_recipes
+from tests.test_recipe_write import recipe_payload
+
+RECIPES_URL = '/api/recipes/'
+
+
+def get_page(client, url):
+    """Страница списка и число запросов к базе для неё."""
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries), response.json()
+
+
+@pytest.fixture
+def commit(django_capture_on_commit_callbacks):
+    """Выполнение колбэков on_commit, как после настоящего коммита."""
+    return lambda: django_capture_on_commit_callbacks(execute=True)
+
+
+@pytest.mark.django_db
+def test_change_committed_during_build_is_not_cached(
+    monkeypatch, client, make_user, make_recipes, commit
+):
+    """Сброс, закоммиченный во время сборки страницы, её не пропускает."""
+    recipe, = make_recipes(make_user('author'), 1)
+    serialize_page = RecipesViewSet.serialize_page
+
+    def serialize_with_concurrent_write(view, recipes, versions):
+        with commit():
+            Recipes.objects.filter(pk=recipe.pk).update(favorites_count=5)
+            invalidate_recipes([recipe.pk], lists=False)
+        return serialize_page(view, recipes, versions)
+
+    monkeypatch.setattr(
+        RecipesViewSet, 'serialize_page', serialize_with_concurrent_write
+    )
+    _, data = get_page(client, RECIPES_URL)
+    assert data['results'][0]['favorites_count'] == 0
+
+    monkeypatch.setattr(RecipesViewSet, 'serialize_page', serialize_page)
+    _, data = get_page(client, RECIPES_URL)
+    assert data['results'][0]['favorites_count'] == 5
+
+
+@pytest.mark.django_db
+def test_recipe_edit_keeps_unrelated_list_pages(
+    client, make_user, make_recipes, make_image, tags, ingredients, commit
+):
+    """Правка текста сбрасывает только страницы с рецептом и поиск."""
+    first_author = make_user('first')
+    edited, = make_recipes(first_author, 1)
+    other_author = make_user('second')
+    make_recipes(other_author, 1)
+    other_url = f'{RECIPES_URL}?author={other_author.id}'
+    search_url = f'{RECIPES_URL}?search=Пирог'
+    for url in (RECIPES_URL, other_url, search_url):
+        get_page(client, url)
+
+    author_client = APIClient()
+    author_client.force_authenticate(first_author)
+    with commit():
+        response = author_client.patch(
+            f'{RECIPES_URL}{edited.id}/',
+            recipe_payload(make_image(), tags[:2], ingredients[:3], 10)
+            | {'name': 'Пирог'},
+            format='json',
+        )
+    assert response.status_code == 200
+
+    queries, _ = get_page(client, other_url)
+    assert queries == 0
+    _, data = get_page(client, RECIPES_URL)
+    assert data['results'][-1]['name'] == 'Пирог'
+    _, data = get_page(client, search_url)
+    assert [recipe['id'] for recipe in data['results']] == [edited.id]
+
+
+@pytest.mark.django_db
+def test_list_membership_changes_reset_list_pages(
+    client, make_user, make_recipes, tags, commit
+):
+    """Создание, смена тегов и удаление сбрасывают все страницы."""
+    author = make_user('author')
+    recipe, = make_recipes(author, 1)
+    tag_url = f'{RECIPES_URL}?tags={tags[2].slug}'
+    assert get_page(client, tag_url)[1]['count'] == 0
+
+    with commit():
+        recipe.tags.add(tags[2])
+    assert get_page(client, tag_url)[1]['count'] == 1
+
+    with commit():
+        tags[2].recipes.clear()
+    assert get_page(client, tag_url)[1]['count'] == 0
+
+    with commit():
+        created, = make_recipes(author, 1)
+    assert get_page(client, RECIPES_URL)[1]['count'] == 2
+
+    with commit():
+        created.delete()
+    assert get_page(client, RECIPES_URL)[1]['count'] == 1
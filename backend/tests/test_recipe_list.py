@@ -0,0 +1,83 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+RECIPES_URL = '/api/recipes/'
+
+
+def count_queries(client, url):
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries), response.json()
+
+
+@pytest.mark.django_db
+def test_recipe_list_queries_do_not_depend_on_page_size(
+    client, user, token_client, make_user, make_recipes
+):
+    """Число запросов не зависит от размера страницы и пользователя."""
+    author = make_user('author')
+    recipes = make_recipes(author, 25)
+    Favorite.objects.create(user=user, recipes=recipes[-1])
+    ShoppingCart.objects.create(author=user, recipes=recipes[-2])
+    Subscription.objects.create(user=user, author=author)
+
+    counts = set()
+    for limit in (5, 20):
+        url = f'{RECIPES_URL}?limit={limit}'
+        anonymous, anonymous_data = count_queries(client, url)
+        authenticated, data = count_queries(token_client, url)
+        assert len(anonymous_data['results']) == limit
+        assert len(data['results']) == limit
+        # Авторизованному запросу нужен ещё поиск токена.
+        assert authenticated == anonymous + 1
+        counts.add(anonymous)
+    assert counts == {4}
+
+    first = data['results'][0]
+    assert first['id'] == recipes[-1].id
+    assert first['is_favorited'] is True
+    assert first['author']['is_subscribed'] is True
+    assert data['results'][1]['is_in_shopping_cart'] is True
+    assert len(first['ingredients']) == 3
+    assert len(first['tags']) == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('enabled, cached_queries', ((True, 0), (False, 4)))
+def test_response_cache_needs_shared_backend(
+    settings, client, make_user, make_recipes, enabled, cached_queries
+):
+    """С кэшем в памяти процесса и несколькими воркерами кэш выключен."""
+    settings.RESPONSE_CACHE_ENABLED = enabled
+    make_recipes(make_user('author'), 3)
+    client.get(RECIPES_URL)
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(RECIPES_URL)
+
+    assert response.status_code == 200
+    assert len(context.captured_queries) == cached_queries
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', (RECIPES_URL, '{url}{id}/'))
+def test_cached_image_urls_follow_request_host(
+    settings, client, token_client, make_user, make_recipes, url
+):
+    """Закэшированные ответы не отдают ссылки с хостом другого запроса."""
+    settings.ALLOWED_HOSTS = ['first.test', 'second.test']
+    recipe, = make_recipes(make_user('author'), 1)
+    url = url.format(url=RECIPES_URL, id=recipe.id)
+
+    for api_client in (client, token_client):
+        for host in ('first.test', 'second.test', 'first.test'):
+            data = api_client.get(url, HTTP_HOST=host).json()
+            data = data['results'][0] if 'results' in data else data
+            assert data['image'].startswith(f'http://{host}/')
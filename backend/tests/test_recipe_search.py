@@ -0,0 +1,117 @@
+import pytest
+from django.core.cache import cache
+
+from recipes.models import Ingredients, IngredientsRecipes, Recipes
+from recipes.search import update_search_vectors
+from tests.test_recipe_write import recipe_payload
+
+RECIPES_URL = '/api/recipes/'
+
+
+def search(client, value):
+    response = client.get(RECIPES_URL, {'search': value})
+    assert response.status_code == 200
+    return [recipe['name'] for recipe in response.json()['results']]
+
+
+@pytest.fixture
+def cookbook(user, tags):
+    """Рецепты со словами в названии, описании и ингредиентах."""
+    beet = Ingredients.objects.create(name='Свёкла', measurement_unit='г')
+    milk = Ingredients.objects.create(name='Молоко', measurement_unit='мл')
+    recipes = {}
+    for name, text, ingredient in (
+        ('Борщ', 'Суп на говяжьем бульоне', beet),
+        ('Блины', 'Тонкие блины к чаю', milk),
+        ('Коктейль с молоком', 'Сладкий напиток', milk),
+    ):
+        recipe = Recipes.objects.create(
+            author=user, name=name, text=text, cooking_time=10,
+            image='recipes/images/recipe.png',
+        )
+        recipe.tags.set(tags[:1])
+        IngredientsRecipes.objects.create(
+            recipes=recipe, ingredient=ingredient, amount=100
+        )
+        recipes[name] = recipe
+    update_search_vectors()
+    return recipes
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('value, expected', (
+    ('борща', ['Борщ']),
+    ('бульон', ['Борщ']),
+    ('свёкла', ['Борщ']),
+    ('чай -суп', ['Блины']),
+    ('суп чай', []),
+))
+def test_search_by_name_text_and_ingredients(client, cookbook, value,
+                                             expected):
+    """Поиск учитывает морфологию и синтаксис websearch."""
+    assert search(client, value) == expected
+
+
+@pytest.mark.django_db
+def test_search_ranks_name_above_ingredients(client, cookbook):
+    assert search(client, 'молоко') == ['Коктейль с молоком', 'Блины']
+
+
+@pytest.mark.django_db
+def test_ingredient_rename_refreshes_search(
+    settings, client, cookbook, django_capture_on_commit_callbacks
+):
+    """Переименование ингредиента пересчитывает вектор и сбрасывает кэш."""
+    settings.RESPONSE_CACHE_ENABLED = True
+    client.get(f'{RECIPES_URL}{cookbook["Борщ"].id}/')
+    assert search(client, 'свёкла') == ['Борщ']
+    beet = Ingredients.objects.get(name='Свёкла')
+    beet.name = 'Буряк'
+    with django_capture_on_commit_callbacks(execute=True):
+        beet.save()
+
+    assert search(client, 'буряк') == ['Борщ']
+    assert search(client, 'свёкла') == []
+    detail = client.get(f'{RECIPES_URL}{cookbook["Борщ"].id}/').json()
+    assert detail['ingredients'][0]['name'] == 'Буряк'
+
+
+@pytest.mark.django_db
+def test_recipe_update_refreshes_search(
+    settings, client, user_client, make_image, tags, cookbook,
+    django_capture_on_commit_callbacks
+):
+    recipe = cookbook['Борщ']
+    milk = Ingredients.objects.get(name='Молоко')
+    payload = recipe_payload(make_image(), tags[:1], [milk], 200)
+    payload.update(name='Окрошка', text='Холодный суп на квасе')
+    settings.RESPONSE_CACHE_ENABLED = True
+    assert search(client, 'квас') == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.patch(
+            f'{RECIPES_URL}{recipe.id}/', payload, format='json'
+        )
+
+    assert response.status_code == 200
+    assert search(client, 'квас') == ['Окрошка']
+    assert search(client, 'борщ') == []
+    assert search(client, 'свёкла') == []
+    assert 'Окрошка' in search(client, 'молоко')
+
+
+@pytest.mark.django_db
+def test_created_recipe_is_found(
+    client, user_client, make_image, tags, ingredients,
+    django_capture_on_commit_callbacks
+):
+    assert search(client, 'ингредиент') == []
+    cache.clear()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post(RECIPES_URL, recipe_payload(
+            make_image(), tags[:1], ingredients[:2], 10
+        ), format='json')
+
+    assert response.status_code == 201
+    assert search(client, 'ингредиент') == ['Рецепт']
@@ -0,0 +1,61 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import IngredientsRecipes
+
+RECIPES_URL = '/api/recipes/'
+
+
+def recipe_payload(image, tags, ingredients, amount):
+    return {
+        'name': 'Рецепт',
+        'text': 'Описание',
+        'cooking_time': 15,
+        'image': image,
+        'tags': [tag.id for tag in tags],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': amount}
+            for ingredient in ingredients
+        ],
+    }
+
+
+def write_recipe(client, method, url, payload):
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, method)(url, payload, format='json')
+    assert response.status_code in (200, 201), response.data
+    return len(context.captured_queries), response.data
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('size', (5, 30))
+def test_recipe_write_queries_do_not_depend_on_ingredients(
+    user_client, make_image, tags, ingredients, size
+):
+    """Создание и обновление рецепта укладываются в фиксированный бюджет."""
+    created_queries, data = write_recipe(
+        user_client, 'post', RECIPES_URL,
+        recipe_payload(make_image(), tags, ingredients[:size], 10),
+    )
+    # Добавление тегов идёт с проверкой существующих связей: на их
+    # смену подписан сброс кэша списков.
+    assert created_queries == 18
+    assert len(data['ingredients']) == size
+
+    kept = ingredients[:size - 3]
+    added = ingredients[size:size + 5]
+    payload = recipe_payload(make_image(), tags[:1], kept + added, 10)
+    for item in payload['ingredients'][:size // 2]:
+        item['amount'] = 20
+    updated_queries, data = write_recipe(
+        user_client, 'patch', f'{RECIPES_URL}{data["id"]}/', payload
+    )
+    assert updated_queries == 19
+
+    amounts = dict(IngredientsRecipes.objects.filter(
+        recipes_id=data['id']
+    ).values_list('ingredient_id', 'amount'))
+    assert amounts == {
+        item['id']: item['amount'] for item in payload['ingredients']
+    }
@@ -0,0 +1,59 @@
+import pytest
+from django.contrib import admin
+
+from recipes.admin import IngredientRecipeAdmin
+from recipes.models import IngredientsRecipes, ShoppingCart, ShoppingListItem
+from recipes.shopping_list import live_shopping_lists
+
+
+def shopping_list(user):
+    return dict(ShoppingListItem.objects.filter(user=user).values_list(
+        'ingredient_id', 'amount'
+    ))
+
+
+def expected_list(user):
+    return {
+        row['recipes__ingredientsrecipes__ingredient_id']: row['total_amount']
+        for row in live_shopping_lists((user.id,))
+    }
+
+
+@pytest.mark.django_db
+def test_admin_writes_keep_shopping_list(
+    user, make_user, make_recipes, ingredients, rf
+):
+    """Изменения из админки попадают в сводный список покупок."""
+    first, second = make_recipes(make_user('author'), 2)
+    ShoppingCart.objects.create(author=user, recipes=first)
+    ShoppingCart.objects.create(author=user, recipes=second)
+    assert shopping_list(user) == expected_list(user) == {
+        ingredient.id: 20 for ingredient in ingredients[:3]
+    }
+
+    model_admin = IngredientRecipeAdmin(IngredientsRecipes, admin.site)
+    request = rf.post('/admin/')
+    row = IngredientsRecipes.objects.get(
+        recipes=first, ingredient=ingredients[0]
+    )
+    row.amount = 25
+    model_admin.save_model(request, row, None, True)
+    row.ingredient = ingredients[5]
+    row.recipes = second
+    model_admin.save_model(request, row, None, True)
+    model_admin.save_model(request, IngredientsRecipes(
+        recipes=first, ingredient=ingredients[6], amount=7
+    ), None, False)
+    model_admin.delete_queryset(request, IngredientsRecipes.objects.filter(
+        recipes=second, ingredient=ingredients[1]
+    ))
+    model_admin.delete_model(request, IngredientsRecipes.objects.get(
+        recipes=first, ingredient=ingredients[2]
+    ))
+    assert shopping_list(user) == expected_list(user)
+
+    ShoppingCart.objects.filter(author=user, recipes=first).delete()
+    assert shopping_list(user) == expected_list(user)
+
+    second.delete()
+    assert shopping_list(user) == expected_list(user) == {}
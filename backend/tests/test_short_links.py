@@ -0,0 +1,97 @@
+import pytest
+
+from recipes.constants import MAX_ID, SHORT_LINK_ALPHABET
+from recipes.short_links import BASE, decode, encode, known_recipes
+
+RECIPES_URL = '/api/recipes/'
+
+
+@pytest.fixture(autouse=True)
+def forget_known_recipes():
+    known_recipes._ids.clear()
+    yield
+    known_recipes._ids.clear()
+
+
+@pytest.mark.parametrize('recipe_id', (
+    0, 1, BASE - 1, BASE, BASE ** 2 + 7, 10 ** 9, MAX_ID,
+))
+def test_code_round_trip(recipe_id):
+    code = encode(recipe_id)
+    assert set(code) <= set(SHORT_LINK_ALPHABET)
+    assert decode(code) == recipe_id
+
+
+@pytest.mark.parametrize('code', (
+    '',
+    '01',
+    'a-b',
+    'a_b',
+    'a/b',
+    'рецепт',
+    'z' * 12,
+    encode(MAX_ID + 1),
+))
+def test_invalid_code_is_rejected(code):
+    assert decode(code) is None
+
+
+@pytest.mark.django_db
+def test_get_link_points_to_recipe(settings, client, make_user, make_recipes):
+    settings.DOMAIN = 'https://foodgram.test'
+    recipe, = make_recipes(make_user('author'), 1)
+
+    response = client.get(f'{RECIPES_URL}{recipe.id}/get-link/')
+
+    assert response.status_code == 200
+    link = response.json()['short-link']
+    prefix = 'https://foodgram.test/s/'
+    assert link.startswith(prefix)
+    assert decode(link[len(prefix):]) == recipe.id
+
+
+@pytest.mark.django_db
+def test_get_link_for_unknown_recipe(client):
+    assert client.get(f'{RECIPES_URL}999999/get-link/').status_code == 404
+
+
+@pytest.mark.django_db
+def test_short_link_redirects_to_recipe(
+    client, make_user, make_recipes, django_assert_num_queries
+):
+    """Повторный переход по ссылке обходится без запросов к базе."""
+    recipe, = make_recipes(make_user('author'), 1)
+    url = f'/s/{encode(recipe.id)}'
+
+    with django_assert_num_queries(1):
+        response = client.get(url)
+    assert response.status_code == 302
+    assert response['Location'] == f'/recipes/{recipe.id}'
+    with django_assert_num_queries(0):
+        assert client.get(url).status_code == 302
+
+
+@pytest.mark.django_db
+def test_deleted_recipe_link_is_not_found(client, make_user, make_recipes):
+    recipe, = make_recipes(make_user('author'), 1)
+    url = f'/s/{encode(recipe.id)}'
+    assert client.get(url).status_code == 302
+
+    recipe_id = recipe.id
+    recipe.delete()
+
+    assert client.get(url).status_code == 404
+    assert client.get(
+        f'{RECIPES_URL}{recipe_id}/get-link/'
+    ).status_code == 404
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('code', ('999999', '0', '01', 'a-b', 'z' * 12))
+def test_unknown_or_invalid_short_link_is_not_found(
+    client, django_assert_num_queries, code
+):
+    """Некорректный код отклоняется без запроса к базе."""
+    queries = 1 if code in ('999999', '0') else 0
+    with django_assert_num_queries(queries):
+        assert client.get(f'/s/{code}').status_code == 404
@@ -0,0 +1,47 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Subscription
+
+SUBSCRIPTIONS_URL = '/api/users/subscriptions/?limit=20&recipes_limit=3'
+
+
+def subscriptions(client):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(SUBSCRIPTIONS_URL)
+    assert response.status_code == 200
+    return len(context.captured_queries), response.data['results']
+
+
+@pytest.mark.django_db
+def test_subscriptions_queries_do_not_depend_on_authors(
+    user, user_client, make_user, make_recipes
+):
+    """Подписки на 1 и 20 авторов загружаются одинаковым числом запросов."""
+    authors = [make_user(f'author_{index}') for index in range(20)]
+    recipes = {
+        author.id: make_recipes(author, 5 if index % 2 else 2)
+        for index, author in enumerate(authors)
+    }
+
+    counts = []
+    for subscribed in (authors[:1], authors[1:]):
+        Subscription.objects.bulk_create(
+            Subscription(user=user, author=author) for author in subscribed
+        )
+        queries, results = subscriptions(user_client)
+        counts.append(queries)
+    assert counts == [3, 3]
+
+    assert len(results) == 20
+    for item in results:
+        expected = sorted(
+            recipes[item['id']],
+            key=lambda recipe: (recipe.pub_date, recipe.id),
+            reverse=True,
+        )[:3]
+        assert [recipe['id'] for recipe in item['recipes']] == [
+            recipe.id for recipe in expected
+        ]
+        assert item['is_subscribed'] is True
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
+from recipes.admin import CountedRelationAdmin
 from users.models import (
     User,
     Subscription
@@ -19,6 +20,8 @@ class UserAdmin(BaseUserAdmin):
         'email',
         'role',
         'avatar',
+        'recipes_count',
+        'subscribers_count',
     )
     list_display_links = ('first_name',)
     empty_value_display = 'значение отсутствует'
@@ -26,9 +29,10 @@ class UserAdmin(BaseUserAdmin):
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(CountedRelationAdmin):
     """Класс настройки раздела подписки."""
 
+    counted_fields = ('user', 'author')
     list_display = (
         'id',
         'user',
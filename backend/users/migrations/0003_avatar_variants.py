@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 05:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_variants',
+            field=models.JSONField(default=dict, editable=False, verbose_name='Уменьшенные копии'),
+        ),
+    ]
@@ -55,6 +55,21 @@ class User(AbstractUser):
         default=None,
         verbose_name='Фотография',
     )
+    avatar_variants = models.JSONField(
+        verbose_name='Уменьшенные копии',
+        default=dict,
+        editable=False,
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False,
+    )
 
     @property
     def is_admin(self):